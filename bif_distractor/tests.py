@@ -0,0 +1,9 @@
+from otree.api import Currency as cu, currency_range, expect, Bot, Submission, SubmissionMustFail
+from . import *
+
+
+class PlayerBot(Bot):
+    def play_round(self):
+        answers = {f'bif_{i}': i % 2 for i in range(1, 11)}
+        yield BIF, answers
+        expect(self.player.bif_score, 5)
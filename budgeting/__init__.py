@@ -1,7 +1,7 @@
 from otree.api import *
+from timing import TimedPage, export_page_times
 from markupsafe import Markup
 import random
-import time
 
 doc = """
 Single-Round Budget Forecasting Experiment:
@@ -272,23 +272,6 @@ class Player(BasePlayer):
         blank=True
     )
 
-    # Page timing
-    consent_page_time = models.FloatField(blank=True, doc="Time spent on consent page in seconds")
-    instructions_page_time = models.FloatField(blank=True, doc="Time spent on instructions page in seconds")
-    knowledge_check_page_time = models.FloatField(blank=True, doc="Time spent on knowledge check page in seconds")
-    context_page_time = models.FloatField(blank=True, doc="Time spent on context page in seconds")
-    construal_level_page_time = models.FloatField(blank=True, doc="Time spent on construal level page in seconds")
-    forecast_page_time = models.FloatField(blank=True, doc="Time spent on initial forecast page in seconds")
-    advice_page_time = models.FloatField(blank=True, doc="Time spent on advice feedback page in seconds")
-    resubmission_page_time = models.FloatField(blank=True, doc="Time spent on resubmission decision page in seconds")
-    mediators_page_time = models.FloatField(blank=True, doc="Time spent on mediators page in seconds")
-    mediators2_page_time = models.FloatField(blank=True, doc="Time spent on mediators2 page in seconds")
-    controls_page_time = models.FloatField(blank=True, doc="Time spent on controls page in seconds")
-    manipulation_check_page_time = models.FloatField(blank=True, doc="Time spent on manipulation check page in seconds")
-    demographics_page_time = models.FloatField(blank=True, doc="Time spent on demographics page in seconds")
-    thanks_page_time = models.FloatField(blank=True, doc="Time spent on thanks page in seconds")
-    intermediate_page_time = models.FloatField(blank=True, doc="Time spent on intermediate page in seconds")
-
 
 # ===== FUNCTIONS =====
 
@@ -314,30 +297,18 @@ def get_category_data():
 
 # ===== PAGES =====
 
-class Consent(Page):
+class Consent(TimedPage):
     template_name = 'budgeting/pages/Consent.html'
     form_model = 'player'
     form_fields = ['declined_consent']
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.consent_page_time = time.time() - player.participant._page_start
+    timing_name = 'consent'
 
 
-class KnowledgeCheck(Page):
+class KnowledgeCheck(TimedPage):
     template_name = 'budgeting/pages/KnowledgeCheck.html'
     form_model = 'player'
     form_fields = ['knowledge_q1', 'knowledge_q2', 'knowledge_q3']
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
+    timing_name = 'knowledge_check'
 
     @staticmethod
     def error_message(player: Player, values):
@@ -353,46 +324,22 @@ class KnowledgeCheck(Page):
         if errors:
             return 'Some answers are incorrect. Please review and try again: ' + ' '.join(errors)
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.knowledge_check_page_time = time.time() - player.participant._page_start
-
 
-class Instructions(Page):
+class Instructions(TimedPage):
     template_name = 'budgeting/pages/Instructions.html'
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.instructions_page_time = time.time() - player.participant._page_start
+    timing_name = 'instructions'
 
 
-class Context(Page):
+class Context(TimedPage):
     template_name = 'budgeting/pages/Context.html'
+    timing_name = 'context'
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.context_page_time = time.time() - player.participant._page_start
 
-
-class ConstrualLevel(Page):
+class ConstrualLevel(TimedPage):
     template_name = 'budgeting/pages/ConstrualLevel.html'
     form_model = 'player'
     form_fields = ['construal_response']
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
+    timing_name = 'construal_level'
 
     @staticmethod
     def vars_for_template(player: Player):
@@ -400,24 +347,12 @@ class ConstrualLevel(Page):
             'construal_level': player.construal_level,
         }
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.construal_level_page_time = time.time() - player.participant._page_start
-
 
-class InitialForecast(Page):
+class InitialForecast(TimedPage):
     template_name = 'budgeting/pages/InitialForecast.html'
     form_model = 'player'
     form_fields = ['comprehension_check', 'initial_forecast', 'budget_adjustment', 'initial_justification']
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._forecast_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.forecast_page_time = time.time() - player.participant._forecast_start
+    timing_name = 'forecast'
 
     @staticmethod
     def error_message(player: Player, values):
@@ -450,17 +385,9 @@ class InitialForecast(Page):
         }
 
 
-class AdviceFeedback(Page):
+class AdviceFeedback(TimedPage):
     template_name = 'budgeting/pages/AdviceFeedback.html'
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._advice_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.advice_page_time = time.time() - player.participant._advice_start
+    timing_name = 'advice'
 
     @staticmethod
     def vars_for_template(player: Player):
@@ -476,28 +403,11 @@ class AdviceFeedback(Page):
         recommended_estimate = category['recommended_estimate']
         recommended_buffer = category['recommended_buffer']
         recommended_budget = recommended_estimate + recommended_buffer
-        buffer_percent = round((recommended_buffer / recommended_estimate) * 100, 1)
         
         estimate_diff = player.initial_forecast - recommended_estimate
         buffer_diff = player.budget_adjustment - recommended_buffer
         budget_diff = final_budget - recommended_budget
         
-        advice_text = f"""
-        <p><strong>Recommended Best Estimate:</strong> CHF {recommended_estimate:,}</p>
-        <p><strong>Recommended Buffer:</strong> CHF {recommended_buffer:,} ({buffer_percent}%)</p>
-        <p><strong>Recommended Budget:</strong> CHF {recommended_budget:,}</p>
-        
-        <p><strong>Rationale:</strong></p>
-        <ul>
-            <li><strong>Historical trend analysis:</strong> {category['trend_description']}</li>
-            <li><strong>Estimate justification:</strong> Based on historical patterns and current economic indicators, 
-            a best estimate of CHF {recommended_estimate:,} reflects the expected {category['name'].lower()} expenses 
-            for the upcoming year.</li>
-            <li><strong>Buffer rationale:</strong> A buffer of CHF {recommended_buffer:,} ({buffer_percent}%) 
-            accounts for potential variations and uncertainties while maintaining fiscal prudence.</li>
-        </ul>
-        """
-        
         data = {
             'category_name': category['name'],
             'category_icon': category['icon'],
@@ -510,7 +420,6 @@ class AdviceFeedback(Page):
             'estimate_diff_display': format_diff(estimate_diff),
             'buffer_diff_display': format_diff(buffer_diff),
             'budget_diff_display': format_diff(budget_diff),
-            'advice_text': advice_text,
         }
 
         # Advisor name based on condition
@@ -526,19 +435,11 @@ class AdviceFeedback(Page):
         }
 
 
-class ResubmissionDecision(Page):
+class ResubmissionDecision(TimedPage):
     template_name = 'budgeting/pages/ResubmissionDecision.html'
     form_model = 'player'
     form_fields = ['resubmit_decision', 'revised_forecast', 'revised_adjustment', 'resubmission_justification']
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._resubmission_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.resubmission_page_time = time.time() - player.participant._resubmission_start
+    timing_name = 'resubmission'
 
     @staticmethod
     def vars_for_template(player: Player):
@@ -597,71 +498,43 @@ class ResubmissionDecision(Page):
                 return 'Please enter your revised buffer.'
 
 
-class ManipulationCheck(Page):
+class ManipulationCheck(TimedPage):
     template_name = 'budgeting/pages/ManipulationCheck.html'
     form_model = 'player'
     form_fields = ['manip_check_advice']
+    timing_name = 'manipulation_check'
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
-    
     @staticmethod
     def error_message(player: Player, values):
         if not values.get('manip_check_advice'):
             return 'Please answer the question about who provided the budget advice.'
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.manipulation_check_page_time = time.time() - player.participant._page_start
 
-
-class Mediators(Page):
+class Mediators(TimedPage):
     template_name = 'budgeting/pages/Mediators.html'
     form_model = 'player'
     form_fields = ['affective_trust_1', 'affective_trust_2', 'affective_trust_3', 'affective_trust_4', 'affective_trust_5']
+    timing_name = 'mediators'
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.mediators_page_time = time.time() - player.participant._page_start
 
-
-class Mediators2(Page):
+class Mediators2(TimedPage):
     template_name = 'budgeting/pages/Mediators2.html'
     form_model = 'player'
     form_fields = ['cognitive_trust_1', 'cognitive_trust_2', 'cognitive_trust_3', 'cognitive_trust_4', 'cognitive_trust_5', 'mediator_attention_check']
+    timing_name = 'mediators2'
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
-    
     @staticmethod
     def error_message(player: Player, values):
         if values.get('mediator_attention_check') != 6:
             return 'Please read the questions carefully and try again.'
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.mediators2_page_time = time.time() - player.participant._page_start
 
-
-class Controls(Page):
+class Controls(TimedPage):
     template_name = 'budgeting/pages/Controls.html'
     form_model = 'player'
     form_fields = ['political_ideology', 'trust_in_government', 'trust_in_ai', 'risk_attitude', 'ai_familiarity']
+    timing_name = 'controls'
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
-    
     @staticmethod
     def error_message(player: Player, values):
         if values.get('political_ideology') is None:
@@ -673,35 +546,19 @@ class Controls(Page):
         if values.get('risk_attitude') is None:
             return 'Please rate your willingness to take risks.'
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.controls_page_time = time.time() - player.participant._page_start
 
-
-class Demographics(Page):
+class Demographics(TimedPage):
     template_name = 'budgeting/pages/Demographics.html'
     form_model = 'player'
     form_fields = ['age', 'gender', 'work_experience', 'politics_experience', 'budgeting_experience']
+    timing_name = 'demographics'
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.demographics_page_time = time.time() - player.participant._page_start
 
-
-class Thanks(Page):
+class Thanks(TimedPage):
     template_name = 'budgeting/pages/Thanks.html'
     form_model = 'player'
     form_fields = ['feedback']
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
+    timing_name = 'thanks'
 
     @staticmethod
     def js_vars(player: Player):
@@ -709,19 +566,11 @@ class Thanks(Page):
             completionlink=player.session.config.get('completionlink', '')
         )
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.thanks_page_time = time.time() - player.participant._page_start
 
-
-class Intermediate(Page):
+class Intermediate(TimedPage):
     template_name = 'budgeting/pages/Intermediate.html'
+    timing_name = 'intermediate'
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._page_start = time.time()
-        return None
-    
     @staticmethod
     def vars_for_template(player: Player):
         # Pass participant info for display and simple redirect URL
@@ -733,7 +582,6 @@ class Intermediate(Page):
     
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        player.intermediate_page_time = time.time() - player.participant._page_start
         player.participant.vars['completed_budgeting'] = True
 
 
@@ -754,3 +602,10 @@ page_sequence = [
     Thanks,
     Intermediate,
 ]
+
+
+# ===== EXPORT =====
+
+def custom_export(players):
+    """Seconds spent on each timed page, one row per player"""
+    yield from export_page_times(players, page_sequence)
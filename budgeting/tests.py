@@ -0,0 +1,63 @@
+from otree.api import Currency as cu, currency_range, expect, Bot, Submission, SubmissionMustFail
+from . import *
+
+
+class PlayerBot(Bot):
+    def play_round(self):
+        yield Consent, dict(declined_consent=False)
+        yield Instructions
+
+        # wrong answers are rejected before the correct ones get through
+        yield SubmissionMustFail(KnowledgeCheck, dict(knowledge_q1='b', knowledge_q2='b', knowledge_q3='a'))
+        yield KnowledgeCheck, dict(knowledge_q1='a', knowledge_q2='b', knowledge_q3='a')
+
+        yield Context
+        yield ConstrualLevel, dict(construal_response='Bot reflection on the budget task.')
+
+        forecast = dict(
+            comprehension_check=C.CATEGORY['comprehension_answer'],
+            initial_forecast=110000,
+            budget_adjustment=5000,
+            initial_justification='Bot justification.',
+        )
+        yield SubmissionMustFail(InitialForecast, dict(forecast, comprehension_check=0))
+        yield InitialForecast, forecast
+
+        yield AdviceFeedback
+
+        # revising without a revised forecast is rejected
+        yield SubmissionMustFail(ResubmissionDecision, dict(
+            resubmit_decision=True,
+            resubmission_justification='Bot revision.',
+        ))
+        yield ResubmissionDecision, dict(
+            resubmit_decision=True,
+            revised_forecast=112000,
+            revised_adjustment=6000,
+            resubmission_justification='Bot revision.',
+        )
+        expect(self.player.revised_forecast, 112000)
+
+        yield Mediators, {f'affective_trust_{i}': 5 for i in range(1, 6)}
+        mediators2 = {f'cognitive_trust_{i}': 5 for i in range(1, 6)}
+        yield SubmissionMustFail(Mediators2, dict(mediators2, mediator_attention_check=4))
+        yield Mediators2, dict(mediators2, mediator_attention_check=6)
+
+        yield Controls, dict(
+            political_ideology=4,
+            trust_in_government=5,
+            trust_in_ai=5,
+            risk_attitude=4,
+            ai_familiarity=6,
+        )
+        yield ManipulationCheck, dict(manip_check_advice=self.player.advice_condition)
+        yield Demographics, dict(
+            age='25-34 years',
+            gender='Prefer not to say',
+            work_experience=5,
+            politics_experience=1,
+            budgeting_experience=2,
+        )
+        yield Thanks, dict(feedback='')
+        yield Intermediate
+        expect(self.participant.vars['completed_budgeting'], True)
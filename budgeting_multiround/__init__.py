@@ -1,6 +1,8 @@
 from otree.api import *
+from otree.models import Participant
+from scoring import score_session
+from timing import TimedPage, export_page_times
 import random
-import time
 
 doc = """
 Multi-Round Budget Forecasting Experiment:
@@ -106,27 +108,6 @@ class Player(BasePlayer):
         doc="Control question to verify participant read the data"
     )
 
-    # Resubmission Decision
-    resubmit_decision = models.BooleanField(
-        label="Based on the advice, do you want to revise your budget submission?",
-        choices=[[True, 'Yes, I want to revise my submission'], [False, 'No, I will keep my original submission']],
-        widget=widgets.RadioSelect
-    )
-    revised_forecast = models.IntegerField(
-        min=0,
-        max=1000,
-        label="Your revised forecast (CHF thousands)",
-        blank=True
-    )
-    revised_adjustment = models.IntegerField(
-        label="Your revised buffer (CHF thousands)",
-        blank=True
-    )
-    resubmission_justification = models.LongStringField(
-        label="Please explain your decision:",
-        blank=False
-    )
-
     # Accuracy results (stored after reveal)
     actual_expense = models.IntegerField(doc="Actual expense for the target year", blank=True)
     initial_accuracy = models.FloatField(doc="Accuracy of initial estimate (absolute % deviation)", blank=True)
@@ -234,47 +215,22 @@ class Player(BasePlayer):
         blank=True
     )
 
-    # Page timing
-    forecast_page_time = models.FloatField(blank=True)
-    advice_page_time = models.FloatField(blank=True)
-    resubmission_page_time = models.FloatField(blank=True)
-    results_page_time = models.FloatField(blank=True)
 
-    # ===== Round 1 Resubmission (stored on round 3 player) =====
-    resubmit_decision_r1 = models.BooleanField(
-        label="Do you want to revise your Education budget?",
-        choices=[[True, 'Yes, revise'], [False, 'No, keep original']],
-        widget=widgets.RadioSelect
-    )
-    revised_forecast_r1 = models.IntegerField(min=0, max=1000, blank=True)
-    revised_adjustment_r1 = models.IntegerField(blank=True)
-    resubmission_justification_r1 = models.LongStringField(
-        label="Explain your decision for Education:"
-    )
+class Revision(ExtraModel):
+    """A participant's resubmission decision for one round's budget.
 
-    # ===== Round 2 Resubmission (stored on round 3 player) =====
-    resubmit_decision_r2 = models.BooleanField(
-        label="Do you want to revise your Infrastructure budget?",
-        choices=[[True, 'Yes, revise'], [False, 'No, keep original']],
-        widget=widgets.RadioSelect
-    )
-    revised_forecast_r2 = models.IntegerField(min=0, max=1000, blank=True)
-    revised_adjustment_r2 = models.IntegerField(blank=True)
-    resubmission_justification_r2 = models.LongStringField(
-        label="Explain your decision for Infrastructure:"
-    )
+    The last round's ResubmissionDecision page writes one row per round, all at once.
+    """
+    participant = models.Link(Participant)
+    round_number = models.IntegerField()
+    resubmit_decision = models.BooleanField()
+    revised_forecast = models.IntegerField()
+    revised_adjustment = models.IntegerField()
+    resubmission_justification = models.LongStringField()
 
-    # ===== Round 3 Resubmission (uses existing fields) =====
-    resubmit_decision_r3 = models.BooleanField(
-        label="Do you want to revise your Security budget?",
-        choices=[[True, 'Yes, revise'], [False, 'No, keep original']],
-        widget=widgets.RadioSelect
-    )
-    revised_forecast_r3 = models.IntegerField(min=0, max=1000, blank=True)
-    revised_adjustment_r3 = models.IntegerField(blank=True)
-    resubmission_justification_r3 = models.LongStringField(
-        label="Explain your decision for Security:"
-    )
+
+# Revision fields included in the data export
+REVISION_FIELDS = ['resubmit_decision', 'revised_forecast', 'revised_adjustment', 'resubmission_justification']
 
 
 # ===== FUNCTIONS =====
@@ -315,10 +271,189 @@ def calculate_accuracy(estimate, actual):
     return round(abs((estimate - actual) / actual) * 100, 2)
 
 
+def format_diff(diff):
+    if diff >= 0:
+        return f"+CHF {diff:,},000"
+    else:
+        return f"CHF {diff:,},000"
+
+
+def build_round_summaries(player):
+    """Build the per-round forecast summary shared by the pages after the last InitialForecast.
+
+    It is kept in participant.vars['round_summaries'], so AdviceFeedback, ResubmissionDecision,
+    ResultsReveal and Thanks don't fetch every round's player and redo the same sums on each render.
+    final_budget equals initial_budget until score_rounds records the resubmission decisions.
+    """
+    summaries = []
+    for p in player.in_all_rounds():
+        category = get_category_data(p.round_number)
+        last_year_actual = category['last_year_actual']
+
+        initial_budget = p.initial_forecast + p.budget_adjustment
+        recommended_estimate = category['recommended_estimate']
+        recommended_buffer = category['recommended_buffer']
+        recommended_budget = recommended_estimate + recommended_buffer
+
+        summaries.append({
+            'round_number': p.round_number,
+            'category_name': category['name'],
+            'category_icon': category['icon'],
+            'initial_forecast': p.initial_forecast,
+            'budget_adjustment': p.budget_adjustment,
+            'initial_budget': initial_budget,
+            'final_budget': initial_budget,
+            'revised': False,
+            'recommended_estimate': recommended_estimate,
+            'recommended_buffer': recommended_buffer,
+            'recommended_budget': recommended_budget,
+            'estimate_diff_display': format_diff(p.initial_forecast - recommended_estimate),
+            'buffer_diff_display': format_diff(p.budget_adjustment - recommended_buffer),
+            'budget_diff_display': format_diff(initial_budget - recommended_budget),
+            'slider_min': max(0, int(last_year_actual * (1 - C.SLIDER_RANGE_PERCENT / 100))),
+            'slider_max': min(1000, int(last_year_actual * (1 + C.SLIDER_RANGE_PERCENT / 100))),
+            'last_year_actual': last_year_actual,
+        })
+    player.participant.vars['round_summaries'] = summaries
+    return summaries
+
+
+def get_round_summaries(player):
+    """The cached per-round summary (built on first use for participants who passed InitialForecast without it)"""
+    summaries = player.participant.vars.get('round_summaries')
+    if summaries is None:
+        summaries = build_round_summaries(player)
+    return summaries
+
+
+def read_revisions(data):
+    """Check the decisions ResubmissionDecision sends, one per round.
+
+    Returns {round_number: {field: value}} with the Revision field names, and a list of error
+    messages (empty if every round is complete). The revised forecast and buffer are only kept
+    for rounds the participant revises.
+    """
+    def to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    sent = {}
+    for item in data if isinstance(data, list) else []:
+        if isinstance(item, dict):
+            sent[to_int(item.get('round_number'))] = item
+
+    revisions = {}
+    errors = []
+    for round_number in range(1, C.NUM_ROUNDS + 1):
+        name = get_category_data(round_number)['name']
+        item = sent.get(round_number, {})
+        decision = item.get('resubmit_decision')
+        justification = item.get('resubmission_justification')
+        revision = {
+            'resubmit_decision': decision if isinstance(decision, bool) else None,
+            'revised_forecast': None,
+            'revised_adjustment': None,
+            'resubmission_justification': justification.strip() if isinstance(justification, str) else '',
+        }
+        if revision['resubmit_decision'] is None:
+            errors.append(f'Please decide whether to revise your {name} budget.')
+        elif revision['resubmit_decision']:
+            revision['revised_forecast'] = to_int(item.get('revised_forecast'))
+            revision['revised_adjustment'] = to_int(item.get('revised_adjustment'))
+            if revision['revised_forecast'] is None or not 0 <= revision['revised_forecast'] <= 1000:
+                errors.append(f'Please enter your revised forecast for {name}.')
+            if revision['revised_adjustment'] is None or revision['revised_adjustment'] < 0:
+                errors.append(f'Please enter your revised buffer for {name}.')
+        if not revision['resubmission_justification']:
+            errors.append(f'Please explain your decision for {name}.')
+        revisions[round_number] = revision
+    return revisions, errors
+
+
+def save_revisions(player, revisions):
+    """Replace the participant's Revision rows with one row per round"""
+    for revision in Revision.filter(participant=player.participant):
+        revision.delete()
+    for round_number, revision in revisions.items():
+        Revision.create(participant=player.participant, round_number=round_number, **revision)
+
+
+def get_revisions(player):
+    """The participant's Revision rows, keyed by round number"""
+    return {revision.round_number: revision for revision in Revision.filter(participant=player.participant)}
+
+
+def score_rounds(player):
+    """Score every round once the resubmission decisions are in; returns the scored round summary.
+
+    Stores the actual expense and accuracies on each round's player (for the data export) and in
+    participant.vars['round_summaries'] (for ResultsReveal and Thanks). Rounds are only scored once:
+    later calls return the stored scores without touching the players again.
+    """
+    summaries = get_round_summaries(player)
+    if all('final_accuracy' in row for row in summaries):
+        return summaries
+
+    summaries = [dict(row) for row in summaries]
+    revisions = get_revisions(player)
+    for p in player.in_all_rounds():
+        row = summaries[p.round_number - 1]
+        actual_expense = get_category_data(p.round_number)['target_year_actual']
+        revision = revisions.get(p.round_number)
+        if revision and revision.resubmit_decision and revision.revised_forecast is not None:
+            final_budget = revision.revised_forecast + (revision.revised_adjustment or 0)
+        else:
+            final_budget = row['initial_budget']
+
+        row.update({
+            'final_budget': final_budget,
+            'revised': bool(revision and revision.resubmit_decision),
+            'actual_expense': actual_expense,
+            'initial_accuracy': calculate_accuracy(row['initial_budget'], actual_expense),
+            'final_accuracy': calculate_accuracy(final_budget, actual_expense),
+            'advisor_accuracy': calculate_accuracy(row['recommended_budget'], actual_expense),
+        })
+        p.actual_expense = actual_expense
+        p.initial_accuracy = row['initial_accuracy']
+        p.final_accuracy = row['final_accuracy']
+        p.advisor_accuracy = row['advisor_accuracy']
+    player.participant.vars['round_summaries'] = summaries
+    return summaries
+
+
+def rescore_session(session, target_year_actuals=None):
+    """Re-score every player of a session in one vectorised pass (see scoring.score_session).
+
+    target_year_actuals maps round numbers to a different actual expense; other rounds use
+    C.CATEGORIES. Only the player fields change, not the round summaries the participants saw.
+    """
+    actuals = {r: category['target_year_actual'] for r, category in C.CATEGORIES.items()}
+    actuals.update(target_year_actuals or {})
+    advisor_budgets = {
+        r: category['recommended_estimate'] + category['recommended_buffer'] for r, category in C.CATEGORIES.items()
+    }
+    rows = (
+        Revision.objects_filter()
+        .join(Participant, Revision.participant_id == Participant.id)
+        .filter(Participant.session_id == session.id)
+        .with_entities(
+            Revision.participant_id,
+            Revision.round_number,
+            Revision.resubmit_decision,
+            Revision.revised_forecast,
+            Revision.revised_adjustment,
+        )
+    )
+    revisions = {(participant_id, round_number): values for participant_id, round_number, *values in rows}
+    return score_session(Player, session, actuals, advisor_budgets, revisions)
+
+
 # ===== PAGES =====
 
 class Consent(Page):
-    template_name = 'budgeting/pages/Consent.html'
+    template_name = 'budgeting_multiround/pages/Consent.html'
     form_model = 'player'
     form_fields = ['declined_consent']
     
@@ -328,7 +463,7 @@ class Consent(Page):
 
 
 class Instructions(Page):
-    template_name = 'budgeting/pages/Instructions.html'
+    template_name = 'budgeting_multiround/pages/Instructions.html'
     
     @staticmethod
     def is_displayed(player: Player):
@@ -343,7 +478,7 @@ class Instructions(Page):
 
 
 class RoleAssignment(Page):
-    template_name = 'budgeting/pages/RoleAssignment.html'
+    template_name = 'budgeting_multiround/pages/RoleAssignment.html'
     
     @staticmethod
     def is_displayed(player: Player):
@@ -386,7 +521,7 @@ class RoleAssignment(Page):
 
 
 class RoundIntro(Page):
-    template_name = 'budgeting/pages/RoundIntro.html'
+    template_name = 'budgeting_multiround/pages/RoundIntro.html'
 
     @staticmethod
     def vars_for_template(player: Player):
@@ -402,19 +537,11 @@ class RoundIntro(Page):
         }
 
 
-class InitialForecast(Page):
-    template_name = 'budgeting/pages/InitialForecast.html'
+class InitialForecast(TimedPage):
+    template_name = 'budgeting_multiround/pages/InitialForecast.html'
     form_model = 'player'
     form_fields = ['comprehension_check', 'initial_forecast', 'budget_adjustment', 'initial_justification']
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._forecast_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.forecast_page_time = time.time() - player.participant._forecast_start
+    timing_name = 'forecast'
 
     @staticmethod
     def error_message(player: Player, values):
@@ -451,81 +578,24 @@ class InitialForecast(Page):
             'role': role,
         }
 
+    @staticmethod
+    def before_next_page(player: Player, timeout_happened):
+        # all forecasts are in, so the pages that follow can share one summary
+        if player.round_number == C.NUM_ROUNDS:
+            build_round_summaries(player)
+
 
-class AdviceFeedback(Page):
-    template_name = 'budgeting/pages/AdviceFeedback.html'
+class AdviceFeedback(TimedPage):
+    template_name = 'budgeting_multiround/pages/AdviceFeedback.html'
+    timing_name = 'advice'
 
     @staticmethod
     def is_displayed(player: Player):
         # Only show after all 3 forecasts are submitted (in round 3)
         return player.round_number == C.NUM_ROUNDS
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._advice_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.advice_page_time = time.time() - player.participant._advice_start
-
     @staticmethod
     def vars_for_template(player: Player):
-        def format_diff(diff):
-            if diff >= 0:
-                return f"+CHF {diff:,},000"
-            else:
-                return f"CHF {diff:,},000"
-
-        # Gather data for all 3 rounds
-        all_rounds_data = []
-        for round_num in range(1, C.NUM_ROUNDS + 1):
-            p = player.in_round(round_num)
-            category = get_category_data(round_num)
-            
-            final_budget = p.initial_forecast + p.budget_adjustment
-            recommended_estimate = category['recommended_estimate']
-            recommended_buffer = category['recommended_buffer']
-            recommended_budget = recommended_estimate + recommended_buffer
-            buffer_percent = round((recommended_buffer / recommended_estimate) * 100, 1)
-            
-            estimate_diff = p.initial_forecast - recommended_estimate
-            buffer_diff = p.budget_adjustment - recommended_buffer
-            budget_diff = final_budget - recommended_budget
-            
-            advice_text = f"""
-            <p><strong>Recommended Best Estimate:</strong> CHF {recommended_estimate:,},000</p>
-            <p><strong>Recommended Buffer:</strong> CHF {recommended_buffer:,},000 ({buffer_percent}%)</p>
-            <p><strong>Recommended Budget:</strong> CHF {recommended_budget:,},000</p>
-            
-            <p><strong>Rationale:</strong></p>
-            <ul>
-                <li><strong>Historical trend analysis:</strong> {category['trend_description']}</li>
-                <li><strong>Estimate justification:</strong> Based on historical patterns and current economic indicators, 
-                a best estimate of CHF {recommended_estimate:,},000 reflects the expected {category['name'].lower()} expenses 
-                for the upcoming year.</li>
-                <li><strong>Buffer rationale:</strong> A buffer of CHF {recommended_buffer:,},000 ({buffer_percent}%) 
-                accounts for potential variations and uncertainties while maintaining fiscal prudence.</li>
-            </ul>
-            """
-            
-            all_rounds_data.append({
-                'round_number': round_num,
-                'category_name': category['name'],
-                'category_name_lower': category['name'].lower(),
-                'category_icon': category['icon'],
-                'initial_forecast': p.initial_forecast,
-                'budget_adjustment': p.budget_adjustment,
-                'final_budget': final_budget,
-                'recommended_estimate': recommended_estimate,
-                'recommended_buffer': recommended_buffer,
-                'recommended_budget': recommended_budget,
-                'estimate_diff_display': format_diff(estimate_diff),
-                'buffer_diff_display': format_diff(buffer_diff),
-                'budget_diff_display': format_diff(budget_diff),
-                'advice_text': advice_text,
-            })
-
         # Advisor name based on condition
         if player.advice_condition == 'human_expert':
             advisor_name = "Civil Servant Budget Specialists"
@@ -536,153 +606,73 @@ class AdviceFeedback(Page):
             'total_rounds': C.NUM_ROUNDS,
             'advice_condition': player.advice_condition,
             'advisor_name': advisor_name,
-            'all_rounds_data': all_rounds_data,
+            'all_rounds_data': get_round_summaries(player),
         }
 
 
-class ResubmissionDecision(Page):
-    template_name = 'budgeting/pages/ResubmissionDecision.html'
-    form_model = 'player'
-    form_fields = [
-        'resubmit_decision_r1', 'revised_forecast_r1', 'revised_adjustment_r1', 'resubmission_justification_r1',
-        'resubmit_decision_r2', 'revised_forecast_r2', 'revised_adjustment_r2', 'resubmission_justification_r2',
-        'resubmit_decision_r3', 'revised_forecast_r3', 'revised_adjustment_r3', 'resubmission_justification_r3',
-    ]
+class ResubmissionDecision(TimedPage):
+    template_name = 'budgeting_multiround/pages/ResubmissionDecision.html'
+    timing_name = 'resubmission'
 
     @staticmethod
     def is_displayed(player: Player):
         # Only show after all 3 forecasts are submitted (in round 3)
         return player.round_number == C.NUM_ROUNDS
 
+    # The page sends the decisions for every round in one message before it submits,
+    # and they are written as one Revision row per round.
     @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._resubmission_start = time.time()
-        return None
+    def live_method(player: Player, data):
+        revisions, errors = read_revisions(data.get('revisions') if isinstance(data, dict) else None)
+        if errors:
+            return {player.id_in_group: dict(saved=False, error=' '.join(errors))}
+        save_revisions(player, revisions)
+        return {player.id_in_group: dict(saved=True)}
+
+    @staticmethod
+    def error_message(player: Player, values):
+        if len(get_revisions(player)) < C.NUM_ROUNDS:
+            return 'Please complete your decision for every category.'
 
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        player.resubmission_page_time = time.time() - player.participant._resubmission_start
-        
-        # Copy revision data to the appropriate round players for data consistency
-        # Round 1
-        p1 = player.in_round(1)
-        p1.resubmit_decision = player.resubmit_decision_r1 or False
-        if player.resubmit_decision_r1:
-            p1.revised_forecast = player.revised_forecast_r1
-            p1.revised_adjustment = player.revised_adjustment_r1
-        p1.resubmission_justification = player.resubmission_justification_r1 or ''
-        
-        # Round 2
-        p2 = player.in_round(2)
-        p2.resubmit_decision = player.resubmit_decision_r2 or False
-        if player.resubmit_decision_r2:
-            p2.revised_forecast = player.revised_forecast_r2
-            p2.revised_adjustment = player.revised_adjustment_r2
-        p2.resubmission_justification = player.resubmission_justification_r2 or ''
-        
-        # Round 3 (current player)
-        player.resubmit_decision = player.resubmit_decision_r3 or False
-        if player.resubmit_decision_r3:
-            player.revised_forecast = player.revised_forecast_r3
-            player.revised_adjustment = player.revised_adjustment_r3
-        player.resubmission_justification = player.resubmission_justification_r3 or ''
+        # score all rounds now, so ResultsReveal and Thanks only read
+        score_rounds(player)
 
     @staticmethod
     def vars_for_template(player: Player):
-        def format_diff(diff):
-            if diff >= 0:
-                return f"+CHF {diff:,},000"
-            else:
-                return f"CHF {diff:,},000"
-
-        # Gather data for all 3 rounds
+        # decisions already saved (e.g. after a reload) are filled in again
+        revisions = get_revisions(player)
         all_rounds_data = []
-        for round_num in range(1, C.NUM_ROUNDS + 1):
-            p = player.in_round(round_num)
-            category = get_category_data(round_num)
-            last_year_actual = category['last_year_actual']
-            
-            slider_min = max(0, int(last_year_actual * (1 - C.SLIDER_RANGE_PERCENT / 100)))
-            slider_max = min(1000, int(last_year_actual * (1 + C.SLIDER_RANGE_PERCENT / 100)))
-            
-            final_budget = p.initial_forecast + p.budget_adjustment
-            recommended_estimate = category['recommended_estimate']
-            recommended_buffer = category['recommended_buffer']
-            recommended_budget = recommended_estimate + recommended_buffer
-            
-            estimate_diff = p.initial_forecast - recommended_estimate
-            buffer_diff = p.budget_adjustment - recommended_buffer
-            budget_diff = final_budget - recommended_budget
-            
-            all_rounds_data.append({
-                'round_number': round_num,
-                'category_name': category['name'],
-                'category_icon': category['icon'],
-                'initial_forecast': p.initial_forecast,
-                'budget_adjustment': p.budget_adjustment,
-                'final_budget': final_budget,
-                'recommended_estimate': recommended_estimate,
-                'recommended_buffer': recommended_buffer,
-                'recommended_budget': recommended_budget,
-                'estimate_diff_display': format_diff(estimate_diff),
-                'buffer_diff_display': format_diff(buffer_diff),
-                'budget_diff_display': format_diff(budget_diff),
-                'slider_min': slider_min,
-                'slider_max': slider_max,
-                'last_year_actual': last_year_actual,
-            })
-
+        for row in get_round_summaries(player):
+            revision = revisions.get(row['round_number'])
+            revised_forecast = row['initial_forecast']
+            adjustment_percent = 0
+            if revision and revision.revised_forecast:
+                revised_forecast = revision.revised_forecast
+                adjustment_percent = round((revision.revised_adjustment or 0) * 100 / revised_forecast)
+            all_rounds_data.append(dict(
+                row,
+                resubmit_decision=revision.resubmit_decision if revision else None,
+                resubmission_justification=revision.resubmission_justification if revision else '',
+                revised_forecast=revised_forecast,
+                adjustment_percent=adjustment_percent,
+            ))
         return {
             'total_rounds': C.NUM_ROUNDS,
             'all_rounds_data': all_rounds_data,
         }
 
-    @staticmethod
-    def error_message(player: Player, values):
-        errors = []
-        
-        # Validate Round 1 revision
-        if values.get('resubmit_decision_r1') == True:
-            if values.get('revised_forecast_r1') is None:
-                errors.append('Please enter your revised forecast for Education.')
-            if values.get('revised_adjustment_r1') is None:
-                errors.append('Please enter your revised buffer for Education.')
-        
-        # Validate Round 2 revision
-        if values.get('resubmit_decision_r2') == True:
-            if values.get('revised_forecast_r2') is None:
-                errors.append('Please enter your revised forecast for Infrastructure.')
-            if values.get('revised_adjustment_r2') is None:
-                errors.append('Please enter your revised buffer for Infrastructure.')
-        
-        # Validate Round 3 revision
-        if values.get('resubmit_decision_r3') == True:
-            if values.get('revised_forecast_r3') is None:
-                errors.append('Please enter your revised forecast for Security.')
-            if values.get('revised_adjustment_r3') is None:
-                errors.append('Please enter your revised buffer for Security.')
-        
-        if errors:
-            return ' '.join(errors)
-
 
-class ResultsReveal(Page):
-    template_name = 'budgeting/pages/ResultsReveal.html'
+class ResultsReveal(TimedPage):
+    template_name = 'budgeting_multiround/pages/ResultsReveal.html'
+    timing_name = 'results'
 
     @staticmethod
     def is_displayed(player: Player):
         # Only show after resubmission decisions (in round 3)
         return player.round_number == C.NUM_ROUNDS
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._results_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.results_page_time = time.time() - player.participant._results_start
-
     @staticmethod
     def vars_for_template(player: Player):
         def format_deviation(dev):
@@ -691,55 +681,24 @@ class ResultsReveal(Page):
             else:
                 return f"CHF {dev:,},000 (under)"
 
-        # Calculate results for all 3 rounds
+        # Results for all 3 rounds (scored when the resubmissions were submitted)
         all_rounds_data = []
-        for round_num in range(1, C.NUM_ROUNDS + 1):
-            p = player.in_round(round_num)
-            category = get_category_data(round_num)
-            actual_expense = category['target_year_actual']
-            p.actual_expense = actual_expense
-            
-            # Calculate initial budget
-            initial_budget = p.initial_forecast + p.budget_adjustment
-            
-            # Calculate final budget
-            if p.resubmit_decision and p.revised_forecast is not None:
-                final_forecast = p.revised_forecast
-                final_adjustment = p.revised_adjustment or 0
-            else:
-                final_forecast = p.initial_forecast
-                final_adjustment = p.budget_adjustment
-            final_budget = final_forecast + final_adjustment
-            
-            # Calculate advisor recommendation
-            recommended_estimate = category['recommended_estimate']
-            recommended_buffer = category['recommended_buffer']
-            advisor_budget = recommended_estimate + recommended_buffer
-            
-            # Calculate accuracies (deviation from actual)
-            initial_deviation = initial_budget - actual_expense
-            final_deviation = final_budget - actual_expense
-            advisor_deviation = advisor_budget - actual_expense
-            
-            p.initial_accuracy = calculate_accuracy(initial_budget, actual_expense)
-            p.final_accuracy = calculate_accuracy(final_budget, actual_expense)
-            p.advisor_accuracy = calculate_accuracy(advisor_budget, actual_expense)
-            
+        for row in score_rounds(player):
             all_rounds_data.append({
-                'round_number': round_num,
-                'category_name': category['name'],
-                'category_icon': category['icon'],
-                'actual_expense': actual_expense,
-                'initial_budget': initial_budget,
-                'final_budget': final_budget,
-                'advisor_budget': advisor_budget,
-                'initial_deviation': format_deviation(initial_deviation),
-                'final_deviation': format_deviation(final_deviation),
-                'advisor_deviation': format_deviation(advisor_deviation),
-                'initial_accuracy': p.initial_accuracy,
-                'final_accuracy': p.final_accuracy,
-                'advisor_accuracy': p.advisor_accuracy,
-                'revised': p.resubmit_decision,
+                'round_number': row['round_number'],
+                'category_name': row['category_name'],
+                'category_icon': row['category_icon'],
+                'actual_expense': row['actual_expense'],
+                'initial_budget': row['initial_budget'],
+                'final_budget': row['final_budget'],
+                'advisor_budget': row['recommended_budget'],
+                'initial_deviation': format_deviation(row['initial_budget'] - row['actual_expense']),
+                'final_deviation': format_deviation(row['final_budget'] - row['actual_expense']),
+                'advisor_deviation': format_deviation(row['recommended_budget'] - row['actual_expense']),
+                'initial_accuracy': row['initial_accuracy'],
+                'final_accuracy': row['final_accuracy'],
+                'advisor_accuracy': row['advisor_accuracy'],
+                'revised': row['revised'],
             })
 
         # Calculate overall averages
@@ -757,7 +716,7 @@ class ResultsReveal(Page):
 
 
 class ManipulationCheck(Page):
-    template_name = 'budgeting/pages/ManipulationCheck.html'
+    template_name = 'budgeting_multiround/pages/ManipulationCheck.html'
     form_model = 'player'
     form_fields = ['manip_check_role', 'manip_check_advice']
     
@@ -774,7 +733,7 @@ class ManipulationCheck(Page):
 
 
 class Impartiality(Page):
-    template_name = 'budgeting/pages/Impartiality.html'
+    template_name = 'budgeting_multiround/pages/Impartiality.html'
     form_model = 'player'
     form_fields = ['impartiality_unbiased', 'impartiality_objective', 'impartiality_fair', 'attention_check']
     
@@ -797,7 +756,7 @@ class Impartiality(Page):
 
 
 class Controls(Page):
-    template_name = 'budgeting/pages/Controls.html'
+    template_name = 'budgeting_multiround/pages/Controls.html'
     form_model = 'player'
     form_fields = ['party_sympathy', 'party_other', 'trust_in_government', 'trust_in_ai', 'risk_attitude']
     
@@ -820,7 +779,7 @@ class Controls(Page):
 
 
 class Demographics(Page):
-    template_name = 'budgeting/pages/Demographics.html'
+    template_name = 'budgeting_multiround/pages/Demographics.html'
     form_model = 'player'
     form_fields = ['age', 'gender', 'work_experience', 'politics_experience', 'budgeting_experience']
     
@@ -830,7 +789,7 @@ class Demographics(Page):
 
 
 class Thanks(Page):
-    template_name = 'budgeting/pages/Thanks.html'
+    template_name = 'budgeting_multiround/pages/Thanks.html'
     form_model = 'player'
     form_fields = ['feedback']
     
@@ -841,25 +800,17 @@ class Thanks(Page):
     @staticmethod
     def vars_for_template(player: Player):
         # Gather summary from all rounds
-        all_rounds = player.in_all_rounds()
         round_summaries = []
-        
-        for p in all_rounds:
-            category = get_category_data(p.round_number)
-            if p.resubmit_decision and p.revised_forecast is not None:
-                final_budget = p.revised_forecast + (p.revised_adjustment or 0)
-            else:
-                final_budget = p.initial_forecast + p.budget_adjustment
-            
+        for row in score_rounds(player):
             round_summaries.append({
-                'round': p.round_number,
-                'category': category['name'],
-                'icon': category['icon'],
-                'final_budget': final_budget,
-                'actual': p.actual_expense,
-                'accuracy': p.final_accuracy,
+                'round': row['round_number'],
+                'category': row['category_name'],
+                'icon': row['category_icon'],
+                'final_budget': row['final_budget'],
+                'actual': row['actual_expense'],
+                'accuracy': row['final_accuracy'],
             })
-        
+
         # Calculate average accuracy
         avg_accuracy = sum(r['accuracy'] for r in round_summaries) / len(round_summaries)
         
@@ -890,3 +841,16 @@ page_sequence = [
     Demographics,
     Thanks,
 ]
+
+
+# ===== EXPORT =====
+
+def custom_export(players):
+    """Seconds spent on each timed page and the round's resubmission decision, one row per player"""
+    players = list(players)
+    revisions = {(revision.participant_id, revision.round_number): revision for revision in Revision.filter()}
+    rows = export_page_times(players, page_sequence)
+    yield next(rows) + REVISION_FIELDS
+    for player, row in zip(players, rows):
+        revision = revisions.get((player.participant_id, player.round_number))
+        yield row + [getattr(revision, field) if revision else None for field in REVISION_FIELDS]
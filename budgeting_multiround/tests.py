@@ -0,0 +1,115 @@
+from otree.api import Currency as cu, currency_range, expect, Bot, Submission, SubmissionMustFail
+from . import *
+from scoring import SCORE_FIELDS
+
+
+class PlayerBot(Bot):
+    def play_round(self):
+        category = get_category_data(self.round_number)
+
+        if self.round_number == 1:
+            yield Consent, dict(declined_consent=False)
+            yield Instructions
+            yield RoleAssignment
+
+        forecast = dict(
+            comprehension_check=category['last_year_actual'],
+            initial_forecast=category['recommended_estimate'],
+            budget_adjustment=5,
+            initial_justification='Bot justification.',
+        )
+        yield SubmissionMustFail(InitialForecast, dict(forecast, comprehension_check=0))
+        yield InitialForecast, forecast
+
+        if self.round_number == C.NUM_ROUNDS:
+            yield AdviceFeedback
+
+            # the decisions were saved by call_live_method below
+            yield ResubmissionDecision
+
+            # one Revision row per round
+            revisions = get_revisions(self.player)
+            expect(sorted(revisions), list(range(1, C.NUM_ROUNDS + 1)))
+            expect(revisions[1].revised_forecast, C.CATEGORIES[1]['recommended_estimate'] + 2)
+            expect(revisions[2].resubmit_decision, False)
+            expect(revisions[3].revised_forecast, None)
+
+            # every round is scored on submit, round 1 with its revised budget
+            expect(
+                self.player.in_round(1).final_accuracy,
+                calculate_accuracy(C.CATEGORIES[1]['recommended_estimate'] + 10, C.CATEGORIES[1]['target_year_actual']),
+            )
+            expect(self.player.final_accuracy, calculate_accuracy(category['recommended_estimate'] + 5, category['target_year_actual']))
+
+            # re-scoring the session in one vectorised pass stores the same scores as the pages,
+            # with round 1 scored on the revised budget from the Revision rows
+            live = {
+                p.id: (p.actual_expense, p.initial_accuracy, p.final_accuracy, p.advisor_accuracy)
+                for p in self.player.in_all_rounds()
+            }
+            result = rescore_session(self.session)
+            rescored = {
+                playerId: scores
+                for playerId, *scores in zip(*[result[key].tolist() for key in ['player_id'] + SCORE_FIELDS])
+                if playerId in live
+            }
+            expect(rescored, {playerId: list(scores) for playerId, scores in live.items()})
+            stored = Player.objects_filter(Player.id.in_(live)).with_entities(Player.id, *[getattr(Player, field) for field in SCORE_FIELDS])
+            expect({playerId: tuple(scores) for playerId, *scores in stored}, live)
+            revised = dict(zip(result['player_id'].tolist(), result['revised'].tolist()))
+            expect(revised[self.player.in_round(1).id], True)
+
+            yield ManipulationCheck, dict(
+                manip_check_role=self.player.role_condition,
+                manip_check_advice=self.player.advice_condition,
+            )
+            impartiality = dict(impartiality_unbiased=5, impartiality_objective=5, impartiality_fair=5)
+            yield SubmissionMustFail(Impartiality, dict(impartiality, attention_check=7))
+            yield Impartiality, dict(impartiality, attention_check=4)
+
+            controls = dict(trust_in_government=5, trust_in_ai=4, risk_attitude=5)
+            yield SubmissionMustFail(Controls, dict(controls, party_sympathy='Andere'))
+            yield Controls, dict(controls, party_sympathy='Andere', party_other='Bot party')
+
+            yield Demographics, dict(
+                age=30,
+                gender='Prefer not to say',
+                work_experience=5,
+                politics_experience=1,
+                budgeting_experience=2,
+            )
+            yield Thanks, dict(feedback='')
+
+
+def call_live_method(method, group, **kwargs):
+    # revise round 1, keep the other rounds
+    revisions = [
+        dict(
+            round_number=1,
+            resubmit_decision=True,
+            revised_forecast=C.CATEGORIES[1]['recommended_estimate'] + 2,
+            revised_adjustment=8,
+            resubmission_justification='Bot revision.',
+        )
+    ] + [
+        dict(round_number=round_number, resubmit_decision=False, resubmission_justification='Bot keeps it.')
+        for round_number in range(2, C.NUM_ROUNDS + 1)
+    ]
+
+    for player in group.get_players():
+        idInGroup = player.id_in_group
+
+        # incomplete decisions are rejected and nothing is saved, so the page can't be submitted yet
+        reply = method(idInGroup, dict(revisions=[dict(revisions[0], revised_forecast=None)] + revisions[1:]))[idInGroup]
+        expect(reply['saved'], False)
+        reply = method(idInGroup, dict(revisions=revisions[:-1]))[idInGroup]
+        expect(reply['saved'], False)
+        expect(ResubmissionDecision.error_message(player, {}), 'Please complete your decision for every category.')
+
+        reply = method(idInGroup, dict(revisions=revisions))[idInGroup]
+        expect(reply['saved'], True)
+
+        # saving again replaces the rows
+        reply = method(idInGroup, dict(revisions=revisions))[idInGroup]
+        expect(reply['saved'], True)
+        expect(len(Revision.filter(participant=player.participant)), C.NUM_ROUNDS)
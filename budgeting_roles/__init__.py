@@ -1,6 +1,7 @@
 from otree.api import *
+from scoring import score_session
+from timing import TimedPage, export_page_times
 import random
-import time
 
 doc = """
 Single-Round Budget Forecasting Experiment:
@@ -235,12 +236,6 @@ class Player(BasePlayer):
         blank=True
     )
 
-    # Page timing
-    forecast_page_time = models.FloatField(blank=True)
-    advice_page_time = models.FloatField(blank=True)
-    resubmission_page_time = models.FloatField(blank=True)
-    results_page_time = models.FloatField(blank=True)
-
 
 # ===== FUNCTIONS =====
 
@@ -267,20 +262,32 @@ def calculate_accuracy(estimate, actual):
     return round(abs((estimate - actual) / actual) * 100, 2)
 
 
+def rescore_session(session, target_year_actuals=None):
+    """Score every player of a session in one vectorised pass (see scoring.score_session).
+
+    The pages don't store accuracies, so this is how the accuracy fields get filled.
+    target_year_actuals can map round 1 to a different actual expense than C.CATEGORY's.
+    """
+    actuals = {1: C.CATEGORY['target_year_actual']}
+    actuals.update(target_year_actuals or {})
+    advisor_budgets = {1: C.CATEGORY['recommended_estimate'] + C.CATEGORY['recommended_buffer']}
+    return score_session(Player, session, actuals, advisor_budgets)
+
+
 # ===== PAGES =====
 
 class Consent(Page):
-    template_name = 'budgeting/pages/Consent.html'
+    template_name = 'budgeting_roles/pages/Consent.html'
     form_model = 'player'
     form_fields = ['declined_consent']
 
 
 class Instructions(Page):
-    template_name = 'budgeting/pages/Instructions.html'
+    template_name = 'budgeting_roles/pages/Instructions.html'
 
 
 class RoleAssignment(Page):
-    template_name = 'budgeting/pages/RoleAssignment.html'
+    template_name = 'budgeting_roles/pages/RoleAssignment.html'
 
     @staticmethod
     def vars_for_template(player: Player):
@@ -315,19 +322,11 @@ class RoleAssignment(Page):
         }
 
 
-class InitialForecast(Page):
-    template_name = 'budgeting/pages/InitialForecast.html'
+class InitialForecast(TimedPage):
+    template_name = 'budgeting_roles/pages/InitialForecast.html'
     form_model = 'player'
     form_fields = ['comprehension_check', 'initial_forecast', 'budget_adjustment', 'initial_justification']
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._forecast_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.forecast_page_time = time.time() - player.participant._forecast_start
+    timing_name = 'forecast'
 
     @staticmethod
     def error_message(player: Player, values):
@@ -363,17 +362,9 @@ class InitialForecast(Page):
         }
 
 
-class AdviceFeedback(Page):
-    template_name = 'budgeting/pages/AdviceFeedback.html'
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._advice_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.advice_page_time = time.time() - player.participant._advice_start
+class AdviceFeedback(TimedPage):
+    template_name = 'budgeting_roles/pages/AdviceFeedback.html'
+    timing_name = 'advice'
 
     @staticmethod
     def vars_for_template(player: Player):
@@ -389,28 +380,11 @@ class AdviceFeedback(Page):
         recommended_estimate = category['recommended_estimate']
         recommended_buffer = category['recommended_buffer']
         recommended_budget = recommended_estimate + recommended_buffer
-        buffer_percent = round((recommended_buffer / recommended_estimate) * 100, 1)
         
         estimate_diff = player.initial_forecast - recommended_estimate
         buffer_diff = player.budget_adjustment - recommended_buffer
         budget_diff = final_budget - recommended_budget
         
-        advice_text = f"""
-        <p><strong>Recommended Best Estimate:</strong> CHF {recommended_estimate:,}</p>
-        <p><strong>Recommended Buffer:</strong> CHF {recommended_buffer:,} ({buffer_percent}%)</p>
-        <p><strong>Recommended Budget:</strong> CHF {recommended_budget:,}</p>
-        
-        <p><strong>Rationale:</strong></p>
-        <ul>
-            <li><strong>Historical trend analysis:</strong> {category['trend_description']}</li>
-            <li><strong>Estimate justification:</strong> Based on historical patterns and current economic indicators, 
-            a best estimate of CHF {recommended_estimate:,} reflects the expected {category['name'].lower()} expenses 
-            for the upcoming year.</li>
-            <li><strong>Buffer rationale:</strong> A buffer of CHF {recommended_buffer:,} ({buffer_percent}%) 
-            accounts for potential variations and uncertainties while maintaining fiscal prudence.</li>
-        </ul>
-        """
-        
         data = {
             'category_name': category['name'],
             'category_icon': category['icon'],
@@ -423,7 +397,6 @@ class AdviceFeedback(Page):
             'estimate_diff_display': format_diff(estimate_diff),
             'buffer_diff_display': format_diff(buffer_diff),
             'budget_diff_display': format_diff(budget_diff),
-            'advice_text': advice_text,
         }
 
         # Advisor name based on condition
@@ -439,19 +412,11 @@ class AdviceFeedback(Page):
         }
 
 
-class ResubmissionDecision(Page):
-    template_name = 'budgeting/pages/ResubmissionDecision.html'
+class ResubmissionDecision(TimedPage):
+    template_name = 'budgeting_roles/pages/ResubmissionDecision.html'
     form_model = 'player'
     form_fields = ['resubmit_decision', 'revised_forecast', 'revised_adjustment', 'resubmission_justification']
-
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._resubmission_start = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.resubmission_page_time = time.time() - player.participant._resubmission_start
+    timing_name = 'resubmission'
 
     @staticmethod
     def vars_for_template(player: Player):
@@ -511,7 +476,7 @@ class ResubmissionDecision(Page):
 
 
 class ManipulationCheck(Page):
-    template_name = 'budgeting/pages/ManipulationCheck.html'
+    template_name = 'budgeting_roles/pages/ManipulationCheck.html'
     form_model = 'player'
     form_fields = ['manip_check_role', 'manip_check_advice']
     
@@ -524,7 +489,7 @@ class ManipulationCheck(Page):
 
 
 class Mediators(Page):
-    template_name = 'budgeting/pages/Mediators.html'
+    template_name = 'budgeting_roles/pages/Mediators.html'
     form_model = 'player'
     form_fields = [
         'impartiality_unbiased', 'impartiality_objective', 'impartiality_fair',
@@ -560,7 +525,7 @@ class Mediators(Page):
 
 
 class Controls(Page):
-    template_name = 'budgeting/pages/Controls.html'
+    template_name = 'budgeting_roles/pages/Controls.html'
     form_model = 'player'
     form_fields = ['political_ideology', 'trust_in_government', 'trust_in_ai', 'risk_attitude']
     
@@ -577,13 +542,13 @@ class Controls(Page):
 
 
 class Demographics(Page):
-    template_name = 'budgeting/pages/Demographics.html'
+    template_name = 'budgeting_roles/pages/Demographics.html'
     form_model = 'player'
     form_fields = ['age', 'gender', 'work_experience', 'politics_experience', 'budgeting_experience']
 
 
 class Thanks(Page):
-    template_name = 'budgeting/pages/Thanks.html'
+    template_name = 'budgeting_roles/pages/Thanks.html'
     form_model = 'player'
     form_fields = ['feedback']
 
@@ -607,3 +572,10 @@ page_sequence = [
     Demographics,
     Thanks,
 ]
+
+
+# ===== EXPORT =====
+
+def custom_export(players):
+    """Seconds spent on each timed page, one row per player"""
+    yield from export_page_times(players, page_sequence)
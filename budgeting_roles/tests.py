@@ -0,0 +1,73 @@
+from otree.api import Currency as cu, currency_range, expect, Bot, Submission, SubmissionMustFail
+from . import *
+from scoring import SCORE_FIELDS
+
+
+class PlayerBot(Bot):
+    def play_round(self):
+        yield Consent, dict(declined_consent=False)
+        yield Instructions
+        yield RoleAssignment
+
+        forecast = dict(
+            comprehension_check=C.CATEGORY['comprehension_answer'],
+            initial_forecast=110000,
+            budget_adjustment=5000,
+            initial_justification='Bot justification.',
+        )
+        yield SubmissionMustFail(InitialForecast, dict(forecast, comprehension_check=0))
+        yield InitialForecast, forecast
+
+        yield AdviceFeedback
+
+        # revising without a revised forecast is rejected
+        yield SubmissionMustFail(ResubmissionDecision, dict(
+            resubmit_decision=True,
+            resubmission_justification='Bot revision.',
+        ))
+        yield ResubmissionDecision, dict(
+            resubmit_decision=False,
+            resubmission_justification='Bot keeps it.',
+        )
+
+        # the pages don't score, so the vectorised rescore must match scoring the player one at a time
+        result = rescore_session(self.session)
+        actual = C.CATEGORY['target_year_actual']
+        expected = [
+            actual,
+            calculate_accuracy(forecast['initial_forecast'] + forecast['budget_adjustment'], actual),
+            calculate_accuracy(forecast['initial_forecast'] + forecast['budget_adjustment'], actual),
+            calculate_accuracy(C.CATEGORY['recommended_estimate'] + C.CATEGORY['recommended_buffer'], actual),
+        ]
+        rescored = {
+            playerId: scores
+            for playerId, *scores in zip(*[result[key].tolist() for key in ['player_id'] + SCORE_FIELDS])
+        }
+        expect(rescored[self.player.id], expected)
+        stored = Player.objects_filter(id=self.player.id).with_entities(*[getattr(Player, field) for field in SCORE_FIELDS]).one()
+        expect(list(stored), expected)
+
+        yield ManipulationCheck, dict(
+            manip_check_role=self.player.role_condition,
+            manip_check_advice=self.player.advice_condition,
+        )
+        mediators = {
+            field: 5 for field in Mediators.form_fields if field != 'attention_check'
+        }
+        yield SubmissionMustFail(Mediators, dict(mediators, attention_check=1))
+        yield Mediators, dict(mediators, attention_check=4)
+
+        yield Controls, dict(
+            political_ideology=4,
+            trust_in_government=5,
+            trust_in_ai=4,
+            risk_attitude=4,
+        )
+        yield Demographics, dict(
+            age='25-34 years',
+            gender='Prefer not to say',
+            work_experience=5,
+            politics_experience=1,
+            budgeting_experience=2,
+        )
+        yield Thanks, dict(feedback='')
@@ -1,6 +1,6 @@
 from otree.api import *
+from timing import TimedPage, export_page_times
 import random
-import time
 
 doc = """
 CrossFit recovery app evaluation survey for CrossFit Bern.
@@ -179,14 +179,6 @@ class Player(BasePlayer):
         label="Any other thoughts or considerations that should be considered in the app development phase?",
         blank=True,
     )
-    
-    # Page timing fields
-    introduction_page_time = models.FloatField(default=0)
-    background_page_time = models.FloatField(default=0)
-    condition1_page_time = models.FloatField(default=0)
-    controls_page_time = models.FloatField(default=0)
-    demographics_page_time = models.FloatField(default=0)
-    thanks_page_time = models.FloatField(default=0)
 
 
 def creating_session(subsession: Subsession):
@@ -196,35 +188,23 @@ def creating_session(subsession: Subsession):
 
 # --- Pages ---
 
-class Introduction(Page):
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._start_time = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.introduction_page_time = time.time() - player.participant._start_time
+class Introduction(TimedPage):
+    timing_name = 'introduction'
 
 
-class Context(Page):
+class Context(TimedPage):
     form_model = 'player'
     form_fields = ['crossfit_frequency', 'mobility_quality', 'cooldown_frequency', 'cooldown_location', 'cooldown_location_other']
+    timing_name = 'background'
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        player.background_page_time = time.time() - player.participant._start_time
         # Ensure condition_type is set (in case creating_session didn't run)
         if not player.condition_type:
             player.condition_type = random.choice(['Actual-Condition', 'Expected-Condition'])
 
 
-class actual_condition(Page):
+class actual_condition(TimedPage):
     form_model = 'player'
     form_fields = [
         'app_general',
@@ -236,22 +216,14 @@ class actual_condition(Page):
         'app_videos',
         'app_instructions',
     ]
+    timing_name = 'condition1'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.condition_type == "Actual-Condition"
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._start_time = time.time()
-        return None
-    
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.condition1_page_time = time.time() - player.participant._start_time
 
 
-class expected_condition(Page):
+class expected_condition(TimedPage):
     form_model = 'player'
     form_fields = [
         'expected_general',
@@ -263,74 +235,42 @@ class expected_condition(Page):
         'expected_videos',
         'expected_instructions',
     ]
+    timing_name = 'condition1'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.condition_type == "Expected-Condition"
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._start_time = time.time()
-        return None
-    
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.condition1_page_time = time.time() - player.participant._start_time
 
 
-class Controls(Page):
+class Controls(TimedPage):
     form_model = 'player'
     form_fields = [
         'stretching_solution_likelihood',
         'offer_improvement_assessment',
     ]
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._start_time = time.time()
-        return None
+    timing_name = 'controls'
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.controls_page_time = time.time() - player.participant._start_time
 
-
-class Demographics(Page):
+class Demographics(TimedPage):
     form_model = 'player'
     form_fields = [
         'age',
         'gender',
         'crossfit_experience',
     ]
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._start_time = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.demographics_page_time = time.time() - player.participant._start_time
+    timing_name = 'demographics'
 
 
-class Thanks(Page):
+class Thanks(TimedPage):
     form_model = 'player'
     form_fields = ['additional_feedback']
+    timing_name = 'thanks'
     
     @staticmethod
     def js_vars(player: Player):
         return {
             'completionlink': player.session.config.get('completionlink', 'https://crossfitbern.ch/')
         }
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        player.participant._start_time = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.thanks_page_time = time.time() - player.participant._start_time
 
 
 page_sequence = [
@@ -341,4 +281,10 @@ page_sequence = [
     Controls,
     Demographics,
     Thanks,
-]
\ No newline at end of file
+]
+
+
+# --- Export ---
+
+def custom_export(players):
+    yield from export_page_times(players, page_sequence)
@@ -0,0 +1,36 @@
+from otree.api import Currency as cu, currency_range, expect, Bot, Submission, SubmissionMustFail
+from . import *
+
+
+# every page is submitted from JavaScript (multi-screen forms with type="button" buttons),
+# so oTree's check for a submit button is switched off
+def submit(PageClass, data=None):
+    return Submission(PageClass, data, check_html=False)
+
+
+class PlayerBot(Bot):
+    def play_round(self):
+        yield submit(Introduction)
+        yield submit(Context, dict(
+            crossfit_frequency='3',
+            mobility_quality='Moderate',
+            cooldown_frequency='Sometimes',
+            cooldown_location='At the gym',
+        ))
+
+        # condition is assigned at random in creating_session
+        if self.player.condition_type == 'Actual-Condition':
+            yield submit(actual_condition, {field: '4' for field in actual_condition.form_fields})
+        else:
+            yield submit(expected_condition, {field: '4' for field in expected_condition.form_fields})
+
+        yield submit(Controls, dict(
+            stretching_solution_likelihood='Often',
+            offer_improvement_assessment='A bit',
+        ))
+        yield submit(Demographics, dict(
+            age='25-34 years',
+            gender='Prefer not to say',
+            crossfit_experience='1-3 years',
+        ))
+        yield submit(Thanks, dict(additional_feedback='Bot feedback'))
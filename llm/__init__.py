@@ -0,0 +1,14 @@
+"""
+Shared LLM helpers for the oTree apps in this project
+"""
+
+from .clients import get_client, get_provider, close_clients
+from .live import dispatch, pending_count
+from .context import ConversationContext
+from .tokens import count_tokens, count_message_tokens
+from .cache import ResponseCache, make_key
+from .streaming import partial_string_value
+from .structured import json_schema_format, parse_output
+from .metering import usage_info, estimate_cost
+from .ratelimit import RateLimiter, get_rate_limiter, with_retries
+from .local import LocalClient
@@ -0,0 +1,88 @@
+"""
+Opt-in cache for LLM responses
+
+Entries live in a bounded in-memory LRU with a time-to-live. If a path is
+given, entries are also written to a SQLite file, so they survive restarts and
+are shared by every process on the same machine. Keys are built with
+make_key() from the model, temperature, a hash of the system prompt and the
+normalised conversation the model is sent, so a reply is only reused for the
+same history, not just the same last message.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def normalise_text(text):
+    """Lowercase and collapse whitespace so trivially different inputs share a key"""
+    return ' '.join(text.lower().split())
+
+
+def make_key(model, temperature, systemPrompt, turns, extra=''):
+    """Cache key for a request; turns is a list of (role, text) pairs"""
+    parts = [
+        model,
+        repr(temperature),
+        hashlib.sha256(systemPrompt.encode('utf-8')).hexdigest(),
+        extra,
+        json.dumps([(role, normalise_text(text)) for role, text in turns]),
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+
+    def __init__(self, maxsize=1000, ttl=3600, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, created REAL)'
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """Cached value for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value, created FROM llm_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    self._remember(key, row[1], row[0])
+                    return row[0]
+        return None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO llm_cache (key, value, created) VALUES (?, ?, ?)',
+                    (key, value, now),
+                )
+                self._db.commit()
+
+    def _remember(self, key, created, value):
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -0,0 +1,105 @@
+"""
+Process-wide registry of OpenAI clients
+
+Every live_method that talks to an LLM should grab its client from here rather
+than building a new OpenAI(...) per message. Clients are keyed on api key and
+base url, and each one owns a keep-alive connection pool, so repeated NPC
+replies reuse the same TLS connections.
+
+The provider is 'openai' unless set with LLM_PROVIDER or per call. 'local' is
+a deterministic offline stand-in for load tests (see local.py).
+
+Pool size and timeouts can be tuned with environment variables:
+    LLM_POOL_SIZE           max open connections per client (default 100)
+    LLM_POOL_KEEPALIVE      idle connections kept open (default 20)
+    LLM_KEEPALIVE_EXPIRY    seconds before an idle connection is closed (default 30)
+    LLM_CONNECT_TIMEOUT     seconds to establish a connection (default 5)
+    LLM_TIMEOUT             seconds to wait for a response (default 60)
+    LLM_PROVIDER            'openai' or 'local' (default openai)
+    LLM_MAX_RETRIES         retries handled by the openai client (default 0, see ratelimit.with_retries)
+"""
+
+from os import environ
+import threading
+
+import httpx
+from openai import OpenAI, DefaultHttpxClient
+
+from .local import LocalClient
+
+
+########################################################
+# Settings                                             #
+########################################################
+
+POOL_SIZE = int(environ.get('LLM_POOL_SIZE', 100))
+POOL_KEEPALIVE = int(environ.get('LLM_POOL_KEEPALIVE', 20))
+KEEPALIVE_EXPIRY = float(environ.get('LLM_KEEPALIVE_EXPIRY', 30))
+CONNECT_TIMEOUT = float(environ.get('LLM_CONNECT_TIMEOUT', 5))
+TIMEOUT = float(environ.get('LLM_TIMEOUT', 60))
+MAX_RETRIES = int(environ.get('LLM_MAX_RETRIES', 0))
+PROVIDER = environ.get('LLM_PROVIDER', 'openai')
+
+PROVIDERS = ('openai', 'local')
+
+
+########################################################
+# Registry                                             #
+########################################################
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _build_client(api_key, base_url, pool_size, timeout):
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=min(POOL_KEEPALIVE, pool_size),
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    httpTimeout = httpx.Timeout(timeout, connect=CONNECT_TIMEOUT)
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=httpTimeout,
+        max_retries=MAX_RETRIES,
+        http_client=DefaultHttpxClient(limits=limits, timeout=httpTimeout),
+    )
+
+
+def get_provider(provider=None):
+    """Provider to use: the one given, else LLM_PROVIDER"""
+    provider = provider or PROVIDER
+    if provider not in PROVIDERS:
+        raise ValueError(f'Unknown LLM provider {provider!r}, expected one of {PROVIDERS}')
+    return provider
+
+
+def get_client(api_key=None, base_url=None, pool_size=None, timeout=None, provider=None):
+    """Return the shared client for this provider / api key / base url, creating it on first use"""
+    provider = get_provider(provider)
+    key = (provider, api_key, base_url)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                if provider == 'local':
+                    client = LocalClient()
+                else:
+                    client = _build_client(
+                        api_key,
+                        base_url,
+                        pool_size or POOL_SIZE,
+                        timeout or TIMEOUT,
+                    )
+                _clients[key] = client
+    return client
+
+
+def close_clients():
+    """Close every pooled connection (e.g. on worker shutdown)"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
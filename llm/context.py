@@ -0,0 +1,73 @@
+"""
+Conversation context for chat completions
+
+Instead of re-serialising the full history into one user message on every
+turn, the context keeps each turn as its own chat message (already a string)
+together with its token count, so appending a turn is O(1). Per-turn
+instructions are sent as a single trailing message and never written into the
+history. When the conversation outgrows the token budget, the oldest turns are
+dropped as new ones are appended, so the context only ever holds the window
+and building a request costs O(window) rather than O(history).
+"""
+
+from collections import deque
+import copy
+
+from .tokens import count_message_tokens
+
+
+class ConversationContext:
+
+    def __init__(self, systemPrompt, model, budget):
+        self.model = model
+        self.budget = budget
+        self.system = {'role': 'system', 'content': systemPrompt}
+        self.systemTokens = count_message_tokens(self.system, model)
+        # the newest turns that fit in the budget next to the system prompt
+        self.turns = deque()
+        self.turnTokens = deque()
+        self.turnsTokens = 0
+        self.windowTokens = 0
+
+    @classmethod
+    def from_history(cls, systemPrompt, history, model, budget):
+        context = cls(systemPrompt, model, budget)
+        for message in history:
+            context.append(message)
+        return context
+
+    def append(self, message):
+        """Add one chat message ({'role': ..., 'content': ...}) to the end of the conversation"""
+        tokens = count_message_tokens(message, self.model)
+        self.turns.append(message)
+        self.turnTokens.append(tokens)
+        self.turnsTokens += tokens
+
+        # turns are only added at the end, so a turn that no longer fits never will again
+        while self.turns and self.turnsTokens > self.budget - self.systemTokens:
+            self.turns.popleft()
+            self.turnsTokens -= self.turnTokens.popleft()
+
+    def copy(self):
+        """A snapshot of the window, e.g. to build a request in another thread while turns are appended"""
+        context = copy.copy(self)
+        context.turns = deque(self.turns)
+        context.turnTokens = deque(self.turnTokens)
+        return context
+
+    def messages(self, instructions):
+        """System prompt, the newest turns that fit in the token budget, then the instructions"""
+        instructionMsg = {'role': 'system', 'content': instructions}
+        remaining = self.budget - self.systemTokens - count_message_tokens(instructionMsg, self.model)
+
+        # walk back from the newest turn until the budget is used up
+        window = []
+        for message, tokens in zip(reversed(self.turns), reversed(self.turnTokens)):
+            if tokens > remaining:
+                break
+            window.append(message)
+            remaining -= tokens
+
+        # tokens in the window, e.g. for metering when the provider reports no usage
+        self.windowTokens = self.budget - remaining
+        return [self.system] + window[::-1] + [instructionMsg]
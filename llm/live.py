@@ -0,0 +1,115 @@
+"""
+Non-blocking LLM calls from oTree live pages
+
+oTree runs every live_method under one global lock, so a synchronous API call
+stalls every other participant's websocket traffic until the completion comes
+back. dispatch() hands the call to a bounded worker pool instead and returns
+immediately. When the call finishes, the result callback runs in its own DB
+session and whatever it returns is pushed to the participant's live page,
+exactly as if live_method had returned it. Calls can also stream partial
+results to the page while they run (see on_progress). If the call fails, the
+error callback's payload is pushed instead (see on_error), so the page is never
+left waiting for a reply that will not come.
+
+The pool size can be tuned with the LLM_WORKERS environment variable
+(default 32), i.e. the number of completions that can be in flight per process.
+"""
+
+from os import environ
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+
+from otree.channels import utils as channel_utils
+from otree.database import session_scope
+from otree.middleware import lock2
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(environ.get('LLM_WORKERS', 32))
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='llm')
+
+# keep references to pending tasks so they are not garbage collected mid-flight
+_pending = set()
+
+
+def dispatch(player, fn, args, on_result, on_progress=None, on_error=None):
+    """Run fn(*args) in the worker pool and push on_result(player, result) to the player's live page
+
+    fn runs outside the event loop, so it must not touch the database; pass it
+    plain values rather than model instances. on_result runs back on the event
+    loop with a freshly loaded player and may read and write models as usual.
+
+    If on_progress is given, fn is called with an extra emit keyword argument.
+    Each emit(value) from the worker pushes on_progress(value) to the page
+    straight away; on_progress must not touch the database either.
+
+    If fn raises, the error is logged and on_error(player), if given, is pushed
+    to the page in place of on_result; it runs like on_result.
+
+    Returns None when the call was dispatched. Outside a running event loop
+    (e.g. oTree's command line bots) the call runs inline and the payload from
+    on_result is returned so live_method can return it directly.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is None:
+        try:
+            if on_progress:
+                result = fn(*args, emit=lambda value: None)
+            else:
+                result = fn(*args)
+        except Exception:
+            logger.exception('LLM call failed')
+            return on_error(player) if on_error else None
+        return on_result(player, result)
+
+    participant = player.participant
+    group = channel_utils.live_group(
+        participant._session_code, participant._index_in_pages, participant.code
+    )
+
+    if on_progress:
+        def emit(value):
+            payload = on_progress(value)
+            if payload:
+                asyncio.run_coroutine_threadsafe(
+                    channel_utils.group_send(group=group, data=payload), loop
+                )
+
+        future = loop.run_in_executor(_executor, lambda: fn(*args, emit=emit))
+    else:
+        future = loop.run_in_executor(_executor, fn, *args)
+    task = loop.create_task(_deliver(future, type(player), player.id, group, on_result, on_error))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def pending_count():
+    """Number of dispatched calls that have not been delivered yet"""
+    return len(_pending)
+
+
+async def _deliver(future, PlayerModel, playerId, group, on_result, on_error):
+    try:
+        result = await future
+    except Exception:
+        logger.exception('LLM call failed')
+        if not on_error:
+            return
+        failed = True
+    else:
+        failed = False
+
+    # same locking and transaction handling oTree uses around live_method
+    async with lock2:
+        with session_scope():
+            player = PlayerModel.objects_get(id=playerId)
+            payload = on_error(player) if failed else on_result(player, result)
+
+    if payload:
+        await channel_utils.group_send(group=group, data=payload)
@@ -0,0 +1,187 @@
+"""
+Local stand-in for the OpenAI chat completions API
+
+LocalClient answers client.chat.completions.create(...) the way OpenAI does,
+with the same response and stream chunk types, but without any network
+traffic or API credits. Replies are deterministic: the same request always
+gets the same reply after the same simulated delay, so load tests can be
+repeated. Select it with get_client(provider='local') or by setting
+LLM_PROVIDER=local.
+
+With a json_schema response_format the reply is a json object that is valid
+against the schema. Values assigned in the last message as "'key': value (type)"
+are echoed back, as a well-behaved model would. Other string fields get
+generated filler text.
+
+Latency is drawn from a lognormal distribution, with about a third of it spent
+before the first token when streaming. It can be tuned with environment
+variables:
+    LLM_LOCAL_LATENCY           median seconds per reply (default 0.8, 0 = no delay)
+    LLM_LOCAL_LATENCY_SIGMA     spread of the lognormal (default 0.5)
+    LLM_LOCAL_SEED              change to get a different but still repeatable run (default 0)
+"""
+
+from os import environ
+import hashlib
+import json
+import random
+import re
+import time
+
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_chunk import Choice as ChunkChoice, ChoiceDelta
+from openai.types.chat.chat_completion_message import ChatCompletionMessage
+
+from .tokens import count_tokens, count_message_tokens
+
+LATENCY = float(environ.get('LLM_LOCAL_LATENCY', 0.8))
+LATENCY_SIGMA = float(environ.get('LLM_LOCAL_LATENCY_SIGMA', 0.5))
+SEED = environ.get('LLM_LOCAL_SEED', '0')
+
+# share of the latency spent before the first streamed token
+FIRST_TOKEN_SHARE = 0.35
+# characters per streamed chunk
+CHUNK_CHARS = 12
+# longest generated filler text, in characters
+MAX_TEXT = 140
+
+ASSIGNED_VALUE = re.compile(r"'(\w+)': (\S+) \((\w+)\)")
+
+WORDS = (
+    'I think the person was near the door around then but I am not completely sure '
+    'it looked like they were in a hurry and someone else might have seen more '
+    'you could ask the others what they noticed about the car and the time'
+).split()
+
+
+class LocalClient:
+
+    def __init__(self, latency=LATENCY, sigma=LATENCY_SIGMA, seed=SEED):
+        self.latency = latency
+        self.sigma = sigma
+        self.seed = seed
+        self.chat = _Chat(self)
+
+    def close(self):
+        pass
+
+    def create(self, model, messages, response_format=None, stream=False, stream_options=None, **ignored):
+        rng = random.Random(self._request_hash(model, messages, response_format))
+        content = _reply(rng, messages, response_format)
+        delay = self.latency * rng.lognormvariate(0, self.sigma) if self.latency else 0
+        promptTokens = sum(count_message_tokens(m, model) for m in messages)
+        completionTokens = count_tokens(content, model)
+        usage = CompletionUsage(
+            prompt_tokens=promptTokens,
+            completion_tokens=completionTokens,
+            total_tokens=promptTokens + completionTokens,
+        )
+        responseId = 'local-' + hashlib.sha256(content.encode('utf-8')).hexdigest()[:24]
+
+        if stream:
+            includeUsage = bool(stream_options and stream_options.get('include_usage'))
+            return self._stream(responseId, model, content, delay, usage if includeUsage else None)
+
+        time.sleep(delay)
+        return ChatCompletion(
+            id=responseId,
+            object='chat.completion',
+            created=int(time.time()),
+            model=model,
+            choices=[Choice(
+                index=0,
+                finish_reason='stop',
+                message=ChatCompletionMessage(role='assistant', content=content),
+            )],
+            usage=usage,
+        )
+
+    def _stream(self, responseId, model, content, delay, usage):
+        pieces = [content[i:i + CHUNK_CHARS] for i in range(0, len(content), CHUNK_CHARS)]
+        time.sleep(delay * FIRST_TOKEN_SHARE)
+        perChunk = delay * (1 - FIRST_TOKEN_SHARE) / max(len(pieces), 1)
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(perChunk)
+            yield self._chunk(responseId, model, [ChunkChoice(index=0, delta=ChoiceDelta(content=piece))])
+        yield self._chunk(responseId, model, [ChunkChoice(index=0, delta=ChoiceDelta(), finish_reason='stop')])
+        if usage is not None:
+            # like OpenAI, usage comes in a final chunk without choices
+            yield self._chunk(responseId, model, [], usage)
+
+    @staticmethod
+    def _chunk(responseId, model, choices, usage=None):
+        return ChatCompletionChunk(
+            id=responseId,
+            object='chat.completion.chunk',
+            created=int(time.time()),
+            model=model,
+            choices=choices,
+            usage=usage,
+        )
+
+    def _request_hash(self, model, messages, response_format):
+        request = json.dumps([self.seed, model, messages, response_format], sort_keys=True, default=str)
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+
+class _Chat:
+
+    def __init__(self, client):
+        self.completions = _Completions(client)
+
+
+class _Completions:
+
+    def __init__(self, client):
+        self.create = client.create
+
+
+########################################################
+# Replies                                              #
+########################################################
+
+def _filler(rng, maxLength=MAX_TEXT):
+    words = []
+    start = rng.randrange(len(WORDS))
+    for i in range(rng.randint(5, 25)):
+        word = WORDS[(start + i) % len(WORDS)]
+        if len(' '.join(words + [word])) > maxLength:
+            break
+        words.append(word)
+    text = ' '.join(words)
+    return text[0].upper() + text[1:] + '.'
+
+
+def _value(rng, schema):
+    kind = schema.get('type')
+    if 'enum' in schema:
+        return rng.choice(schema['enum'])
+    if kind == 'object':
+        return {name: _value(rng, prop) for name, prop in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [_value(rng, schema.get('items', {})) for _ in range(rng.randint(1, 3))]
+    if kind == 'integer':
+        return rng.randint(0, 100)
+    if kind == 'number':
+        return round(rng.uniform(0, 100), 2)
+    if kind == 'boolean':
+        return rng.random() < 0.5
+    return _filler(rng)
+
+
+def _reply(rng, messages, response_format):
+    """Reply text for the request: schema-valid json if a json_schema format was given"""
+    if not response_format or response_format.get('type') != 'json_schema':
+        return _filler(rng)
+
+    schema = response_format['json_schema']['schema']
+    reply = _value(rng, schema)
+    lastMessage = messages[-1]['content'] if messages else ''
+    properties = schema.get('properties', {})
+    for key, value, kind in ASSIGNED_VALUE.findall(lastMessage or ''):
+        if properties.get(key, {}).get('type') == 'string':
+            reply[key] = value
+    return json.dumps(reply)
@@ -0,0 +1,46 @@
+"""
+Token, latency and cost accounting for LLM calls
+
+usage_info() turns a finished call into a flat dict that can be stored on a
+model. Token counts come from the provider's usage report when there is one
+and are estimated with tiktoken otherwise.
+"""
+
+import time
+
+from .tokens import count_tokens
+
+# USD per million tokens as (prompt, completion); update when provider prices change
+PRICES = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-4.1': (2.00, 8.00),
+}
+
+
+def estimate_cost(model, promptTokens, completionTokens):
+    """Estimated cost in USD (0 for models missing from PRICES)"""
+    promptPrice, completionPrice = PRICES.get(model, (0, 0))
+    return (promptTokens * promptPrice + completionTokens * completionPrice) / 1_000_000
+
+
+def usage_info(model, started, usage=None, promptTokens=0, completionText=None):
+    """Model, token counts, wall time since started (time.perf_counter()) and cost of a call
+
+    usage is the provider's usage object, if any; otherwise promptTokens and
+    the tokens in completionText are used as estimates.
+    """
+    if usage is not None:
+        promptTokens = usage.prompt_tokens
+        completionTokens = usage.completion_tokens
+    else:
+        completionTokens = count_tokens(completionText, model) if completionText else 0
+
+    return dict(
+        model=model,
+        promptTokens=promptTokens,
+        completionTokens=completionTokens,
+        latency=time.perf_counter() - started,
+        cost=estimate_cost(model, promptTokens, completionTokens),
+    )
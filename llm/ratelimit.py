@@ -0,0 +1,204 @@
+"""
+Rate limiting and retries for outbound LLM requests
+
+The limiter keeps two token buckets, requests per minute and tokens per
+minute, in a small database table. Every process that points at the same
+database shares one budget: the web and worker dynos, or several servers.
+By default that is the database in DATABASE_URL, which oTree uses in
+production. Without it the buckets go to their own SQLite file,
+llm_ratelimit.sqlite3 in the working directory, and a warning is logged: only
+processes on the same machine share that file. They don't go into oTree's
+local db.sqlite3, which the devserver overwrites from memory.
+Each bucket is stored in its GCRA form, a single "theoretical arrival time",
+so taking from a bucket is one conditional UPDATE. That works on SQLite and
+Postgres without table locks. A semaphore also caps how many requests each
+process has in flight, and with_retries() retries 429 and 5xx responses with
+jittered exponential backoff.
+
+The local stand-in provider only gets the concurrency cap, so load tests
+against it measure the app rather than the shared budget.
+
+Settings (environment variables):
+    LLM_RPM                 requests per minute, shared by all processes (default 500, 0 = off)
+    LLM_TPM                 tokens per minute, shared by all processes (default 200000, 0 = off)
+    LLM_RATE_BURST          seconds of budget that may be used at once (default 10)
+    LLM_MAX_CONCURRENCY     in-flight requests per process (default 16)
+    LLM_RATE_LIMIT_DB       database url for the shared buckets (default DATABASE_URL, else sqlite:///llm_ratelimit.sqlite3)
+    LLM_RETRIES             retries on 429/5xx (default 5)
+    LLM_RETRY_BASE          first backoff in seconds, doubled each retry (default 0.5)
+    LLM_RETRY_CAP           longest backoff in seconds (default 20)
+"""
+
+from contextlib import contextmanager
+from os import environ
+import logging
+import random
+import threading
+import time
+
+import openai
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from .clients import get_provider
+
+logger = logging.getLogger(__name__)
+
+RPM = int(environ.get('LLM_RPM', 500))
+TPM = int(environ.get('LLM_TPM', 200000))
+BURST = float(environ.get('LLM_RATE_BURST', 10))
+MAX_CONCURRENCY = int(environ.get('LLM_MAX_CONCURRENCY', 16))
+LOCAL_RATE_LIMIT_DB = 'sqlite:///llm_ratelimit.sqlite3'
+RATE_LIMIT_DB = environ.get('LLM_RATE_LIMIT_DB') or environ.get('DATABASE_URL') or LOCAL_RATE_LIMIT_DB
+RETRIES = int(environ.get('LLM_RETRIES', 5))
+RETRY_BASE = float(environ.get('LLM_RETRY_BASE', 0.5))
+RETRY_CAP = float(environ.get('LLM_RETRY_CAP', 20))
+
+# longest single sleep while waiting for budget, so waiters re-check regularly
+MAX_POLL = 1.0
+
+
+########################################################
+# Shared token bucket                                  #
+########################################################
+
+class SharedBucket:
+    """Token bucket refilled at perMinute units per minute, stored as one row of a shared table"""
+
+    def __init__(self, engine, name, perMinute, burst):
+        self.engine = engine
+        self.name = name
+        self.interval = 60 / perMinute  # seconds of budget one unit uses
+        self.burst = burst
+        with engine.begin() as conn:
+            conn.execute(text(
+                'CREATE TABLE IF NOT EXISTS llm_rate_limit (name VARCHAR(100) PRIMARY KEY, tat FLOAT NOT NULL)'
+            ))
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text('INSERT INTO llm_rate_limit (name, tat) VALUES (:name, 0)'),
+                    name=name,
+                )
+        except IntegrityError:
+            # another process created it first
+            pass
+
+    def try_take(self, units):
+        """Take units from the bucket if available; otherwise return the seconds to wait"""
+        now = time.time()
+        increment = units * self.interval
+        # a single request bigger than the burst is allowed once the bucket is full
+        tolerance = max(self.burst, increment)
+        start = 'CASE WHEN tat > :now THEN tat ELSE :now END'
+        with self.engine.begin() as conn:
+            updated = conn.execute(
+                text(
+                    f'UPDATE llm_rate_limit SET tat = {start} + :inc '
+                    f'WHERE name = :name AND {start} + :inc - :now <= :tol'
+                ),
+                now=now, inc=increment, name=self.name, tol=tolerance,
+            ).rowcount
+            if updated:
+                return 0
+            tat = conn.execute(
+                text('SELECT tat FROM llm_rate_limit WHERE name = :name'), name=self.name
+            ).scalar()
+        return max(tat, now) + increment - now - tolerance
+
+
+########################################################
+# Limiter                                              #
+########################################################
+
+class RateLimiter:
+
+    def __init__(self, rpm=RPM, tpm=TPM, burst=BURST, maxConcurrency=MAX_CONCURRENCY, url=RATE_LIMIT_DB):
+        self.buckets = []
+        if rpm or tpm:
+            if url == LOCAL_RATE_LIMIT_DB:
+                logger.warning(
+                    'LLM rate limits are kept in %s, which processes on other machines (e.g. separate '
+                    'web and worker dynos) do not share; set DATABASE_URL or LLM_RATE_LIMIT_DB', url
+                )
+            engine = create_engine(url, connect_args={'timeout': 30} if url.startswith('sqlite') else {})
+            if rpm:
+                self.buckets.append((SharedBucket(engine, 'requests', rpm, burst), False))
+            if tpm:
+                self.buckets.append((SharedBucket(engine, 'tokens', tpm, burst), True))
+        self.semaphore = threading.BoundedSemaphore(maxConcurrency)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.inFlight = 0
+
+    @contextmanager
+    def slot(self, tokens):
+        """Block until a request of about `tokens` tokens fits the budget; yields the seconds spent waiting"""
+        started = time.perf_counter()
+        self._count('waiting', 1)
+        try:
+            for bucket, perToken in self.buckets:
+                units = tokens if perToken else 1
+                while True:
+                    wait = bucket.try_take(units)
+                    if wait <= 0:
+                        break
+                    time.sleep(min(wait, MAX_POLL) * random.uniform(0.5, 1))
+            self.semaphore.acquire()
+        finally:
+            self._count('waiting', -1)
+
+        self._count('inFlight', 1)
+        try:
+            yield time.perf_counter() - started
+        finally:
+            self._count('inFlight', -1)
+            self.semaphore.release()
+
+    def stats(self):
+        """Requests queued for budget and requests in flight in this process"""
+        return dict(waiting=self.waiting, inFlight=self.inFlight)
+
+    def _count(self, name, delta):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+
+_limiters = {}
+_limiterLock = threading.Lock()
+
+
+def get_rate_limiter(provider=None):
+    """The process-wide limiter for a provider, configured from the environment"""
+    provider = get_provider(provider)
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiterLock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                limiter = RateLimiter(rpm=0, tpm=0) if provider == 'local' else RateLimiter()
+                _limiters[provider] = limiter
+    return limiter
+
+
+########################################################
+# Retries                                              #
+########################################################
+
+def _retryable(exc):
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def with_retries(fn, retries=RETRIES, base=RETRY_BASE, cap=RETRY_CAP):
+    """Call fn(), retrying 429/5xx/connection errors with full-jitter exponential backoff"""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except openai.APIError as exc:
+            if attempt == retries or not _retryable(exc):
+                raise
+            delay = random.uniform(0, min(cap, base * 2 ** attempt))
+            logger.warning(f'LLM request failed ({exc.__class__.__name__}), retrying in {delay:.1f}s')
+            time.sleep(delay)
@@ -0,0 +1,80 @@
+"""
+Helpers for streamed completions
+
+Structured replies stream in as fragments of a JSON document, so the text the
+participant should see has to be pulled out of an unfinished object.
+"""
+
+import re
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f'}
+_HEX = set('0123456789abcdefABCDEF')
+
+# a \uXXXX escape whose digits haven't all arrived yet
+_INCOMPLETE = object()
+
+
+def _unicode_escape(buffer, i):
+    """Code unit of the \\uXXXX escape at buffer[i], None if it is malformed, or _INCOMPLETE"""
+    digits = buffer[i + 2:i + 6]
+    if not all(c in _HEX for c in digits):
+        return None
+    if len(digits) < 4:
+        return _INCOMPLETE
+    return int(digits, 16)
+
+
+def partial_string_value(buffer, key):
+    """Decoded, possibly unfinished, string value of key in a partial JSON object (None if not started)"""
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(key), buffer)
+    if match is None:
+        return None
+
+    chars = []
+    i = match.end()
+    while i < len(buffer):
+        ch = buffer[i]
+        if ch == '"':
+            break
+        if ch == '\\':
+            # stop at an escape sequence that hasn't fully arrived yet
+            if i + 1 >= len(buffer):
+                break
+            esc = buffer[i + 1]
+            if esc == 'u':
+                code = _unicode_escape(buffer, i)
+                if code is _INCOMPLETE:
+                    break
+                if code is None:
+                    # malformed: keep the text as it is rather than lose the whole reply
+                    chars.append(buffer[i:i + 2])
+                    i += 2
+                    continue
+                end = i + 6
+                if 0xD800 <= code <= 0xDBFF:
+                    # a high surrogate is only decoded together with the low half that follows it
+                    following = buffer[end:end + 2]
+                    if following in ('', '\\'):
+                        break
+                    if following == '\\u':
+                        low = _unicode_escape(buffer, end)
+                        if low is _INCOMPLETE:
+                            break
+                        if low is not None and 0xDC00 <= low <= 0xDFFF:
+                            chars.append(chr(0x10000 + (code - 0xD800) * 0x400 + (low - 0xDC00)))
+                            i = end + 6
+                            continue
+                    chars.append(buffer[i:end])
+                elif 0xDC00 <= code <= 0xDFFF:
+                    # a low surrogate on its own can't be decoded either
+                    chars.append(buffer[i:end])
+                else:
+                    chars.append(chr(code))
+                i = end
+                continue
+            chars.append(_ESCAPES.get(esc, esc))
+            i += 2
+            continue
+        chars.append(ch)
+        i += 1
+    return ''.join(chars)
@@ -0,0 +1,40 @@
+"""
+Structured output with pydantic models
+
+json_schema_format() turns a model into the response_format used by the
+chat completions API (build it once at import, not per call).
+parse_output() validates the raw reply straight into the model with
+pydantic's JSON validator and falls back instead of raising on bad output.
+"""
+
+import logging
+
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+def json_schema_format(model, name=None):
+    """response_format for strict structured output matching a pydantic model"""
+    schema = model.model_json_schema()
+    # strict mode requires every object to forbid extra keys
+    for obj in [schema] + list(schema.get('$defs', {}).values()):
+        if obj.get('type') == 'object':
+            obj['additionalProperties'] = False
+    return {
+        'type': 'json_schema',
+        'json_schema': {
+            'name': name or model.__name__,
+            'strict': True,
+            'schema': schema,
+        },
+    }
+
+
+def parse_output(model, raw, fallback):
+    """Validate raw JSON into model; if it is missing or malformed, log it and return fallback(raw)"""
+    try:
+        return model.model_validate_json(raw or '')
+    except ValidationError:
+        logger.warning(f'Malformed {model.__name__} output: {raw!r}')
+        return fallback(raw)
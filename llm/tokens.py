@@ -0,0 +1,44 @@
+"""
+Token counting with tiktoken
+
+Counts are memoised per text, so a conversation history that grows by one turn
+at a time only pays for encoding the new turn. If the tiktoken encoding cannot
+be loaded (it is downloaded on first use), counts fall back to a rough
+four-characters-per-token estimate instead of failing the request.
+"""
+
+import functools
+import logging
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# tokens the chat format adds around every message (role, separators)
+MESSAGE_OVERHEAD = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('o200k_base')
+    except Exception:
+        logger.warning(f'Could not load tiktoken encoding for {model}, estimating token counts')
+        return None
+
+
+@functools.lru_cache(maxsize=8192)
+def count_tokens(text, model):
+    """Number of tokens in text for the given model"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(message, model):
+    """Number of tokens a single chat message adds to a request"""
+    return MESSAGE_OVERHEAD + count_tokens(message['content'], model)
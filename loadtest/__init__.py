@@ -0,0 +1,9 @@
+"""
+Load tests for the oTree apps in this project
+
+These scripts drive a running server (otree devserver or prodserver) over
+HTTP and websockets, so they measure the whole stack rather than the page code
+alone.
+    python -m loadtest.bots         many participants clicking through a session with their PlayerBots
+    python -m loadtest.live         many participants chatting on the threejs live page
+"""
@@ -0,0 +1,152 @@
+"""
+HTTP load test: many participants clicking through a session at once
+
+Creates a browser-bots session on a running server, so each app's tests.py
+PlayerBot supplies the answers server-side, then plays every participant
+concurrently without a browser: GET a page, POST it while the server says the
+bot has another submission, follow the redirect, and poll wait pages. At the
+end it prints p50/p95/p99 latency per page and the overall requests per second.
+
+Usage (against `otree devserver` or `otree prodserver`):
+    python -m loadtest.bots budgeting 50
+    python -m loadtest.bots spec_design2 200 --server https://my-app.herokuapp.com --ramp 30
+
+If the server runs with OTREE_AUTH_LEVEL set, OTREE_REST_KEY must be set to
+the server's REST key (or passed with --rest-key).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+from urllib.parse import urljoin, urlparse
+import argparse
+import time
+
+import requests
+
+from .report import Timings
+
+# marker oTree appends to a page when the browser bot has another submission queued
+AUTO_SUBMIT_MARKER = 'browser-bot-auto-submit'
+WAIT_PAGE_HEADER = 'oTree-Wait-Page'
+REST_KEY_HEADER = 'otree-rest-key'
+
+# seconds before a single request counts as failed
+REQUEST_TIMEOUT = 60
+# safety net against a participant stuck in a loop (e.g. a bot that keeps failing validation)
+MAX_REQUESTS_PER_PARTICIPANT = 500
+
+
+########################################################
+# Session setup                                        #
+########################################################
+
+def create_session(server, configName, numParticipants, restKey=None):
+    """Create a browser-bots session; returns its code and the participant codes"""
+    headers = {REST_KEY_HEADER: restKey} if restKey else {}
+    response = requests.post(
+        f'{server}/create_browser_bots_session',
+        json=dict(session_config_name=configName, num_participants=numParticipants, case_number=None),
+        headers=headers,
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    sessionCode = response.text
+
+    # the endpoint also points the admin's browser-bot launcher at this session; undo that
+    requests.post(f'{server}/close_browser_bots_session', headers=headers, timeout=REQUEST_TIMEOUT)
+
+    return sessionCode, participant_codes(server, sessionCode, restKey)
+
+
+def participant_codes(server, sessionCode, restKey=None):
+    """Codes of a session's participants, in id_in_session order"""
+    headers = {REST_KEY_HEADER: restKey} if restKey else {}
+    response = requests.get(f'{server}/api/sessions/{sessionCode}', headers=headers, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return [p['code'] for p in response.json()['participants']]
+
+
+########################################################
+# Participants                                         #
+########################################################
+
+def page_label(url):
+    """'app/Page' for a participant page url (/p/<code>/<app>/<Page>/<index>), else the first path segment"""
+    parts = urlparse(url).path.strip('/').split('/')
+    if len(parts) >= 4 and parts[0] == 'p':
+        return f'{parts[2]}/{parts[3]}'
+    return parts[0]
+
+
+def play_participant(server, participantCode, timings, think=0, waitPoll=1):
+    """Play one participant to the end; returns True if the bot finished"""
+    http = requests.Session()
+    url = f'{server}/InitializeParticipant/{participantCode}'
+    method = 'GET'
+
+    for _ in range(MAX_REQUESTS_PER_PARTICIPANT):
+        label = f'{method} {page_label(url)}'
+        started = time.perf_counter()
+        try:
+            # the browser's own form values don't matter: the server swaps in the bot's submission
+            response = http.request(method, url, allow_redirects=False, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException:
+            timings.error(label)
+            return False
+        timings.record(label, time.perf_counter() - started)
+
+        if response.is_redirect:
+            url = urljoin(url, response.headers['Location'])
+            method = 'GET'
+        elif response.status_code >= 400:
+            timings.error(label)
+            return False
+        elif AUTO_SUBMIT_MARKER in response.text:
+            time.sleep(think)
+            method = 'POST'
+        elif response.headers.get(WAIT_PAGE_HEADER):
+            time.sleep(waitPoll)
+            method = 'GET'
+        else:
+            # no submission queued: the bot has played all its pages
+            return True
+    return False
+
+
+def run(server, configName, numParticipants, restKey=None, ramp=0, think=0):
+    server = server.rstrip('/')
+    sessionCode, participantCodes = create_session(server, configName, numParticipants, restKey)
+    print(f'Session {sessionCode}: {len(participantCodes)} participants')
+
+    timings = Timings()
+
+    def play(index, participantCode):
+        # spread the starts over the ramp-up period
+        time.sleep(ramp * index / len(participantCodes))
+        return play_participant(server, participantCode, timings, think)
+
+    with ThreadPoolExecutor(max_workers=len(participantCodes)) as executor:
+        finished = list(executor.map(play, range(len(participantCodes)), participantCodes))
+    timings.stop()
+
+    print(timings.report(configName))
+    print(f'{sum(finished)} of {len(finished)} participants finished')
+    return all(finished)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play many oTree bots at once over HTTP and report page latency')
+    parser.add_argument('session_config', help='name of a session config in settings.py')
+    parser.add_argument('participants', type=int, help='number of concurrent participants')
+    parser.add_argument('--server', default='http://localhost:8000', help='base url of the running server')
+    parser.add_argument('--rest-key', default=environ.get('OTREE_REST_KEY'), help='REST key (default: $OTREE_REST_KEY)')
+    parser.add_argument('--ramp', type=float, default=0, help='seconds over which participants start (default 0)')
+    parser.add_argument('--think', type=float, default=0, help='seconds each participant waits before submitting a page')
+    args = parser.parse_args()
+
+    ok = run(args.server, args.session_config, args.participants, args.rest_key, args.ramp, args.think)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
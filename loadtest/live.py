@@ -0,0 +1,270 @@
+"""
+Websocket load test for the threejs chat live page
+
+oTree's bots never call live_method, but that is where the chat spends its
+server time. This script creates a regular session on a running server,
+opens every participant's chat page and live socket, and replays the
+messages chat.html sends:
+    phase       once on connect
+    posCheck    a batch of position samples every few seconds
+    text        bursts of messages typed next to an NPC
+    botMsg      sent as soon as the server echoes a text, like chat.html does
+It records the server round trip of each event: until the 'phase', 'posAck'
+or 'text' reply arrives, and for botMsg until the first streamed 'botDelta'
+and until the finished 'botText'. Replies still missing when the test ends
+count as errors.
+
+The chat page times out after 60 seconds, after which the server ignores
+the participant's live messages, so keep --duration below that.
+
+Run it against a session config with app_sequence=['threejs'], ideally with
+llm_provider='local' so NPC replies don't use API credits:
+    python -m loadtest.live threejs 50
+    python -m loadtest.live threejs 200 --ramp 20 --text-every 10
+
+If the server runs with OTREE_AUTH_LEVEL set, OTREE_REST_KEY must be set to
+the server's REST key (or passed with --rest-key).
+"""
+
+from collections import defaultdict, deque
+from os import environ
+from urllib.parse import urlparse
+import argparse
+import asyncio
+import html
+import json
+import random
+import re
+import time
+
+import requests
+import websockets
+
+from .bots import REQUEST_TIMEOUT, REST_KEY_HEADER, participant_codes
+from .report import Timings
+
+# the live socket, not the other sockets oTree opens on every page
+SOCKET_URL = re.compile(r'id="otree-live" data-socket-url="([^"]+)"')
+
+# seconds to wait for outstanding replies after the test duration
+DRAIN_SECONDS = 30
+# how far from an NPC a participant stands when talking to it
+TALK_OFFSET = 3
+
+
+########################################################
+# Session setup                                        #
+########################################################
+
+def create_session(server, configName, numParticipants, restKey=None):
+    """Create a regular (non-bot) session; returns its code and the participant codes"""
+    headers = {REST_KEY_HEADER: restKey} if restKey else {}
+    response = requests.post(
+        f'{server}/api/sessions',
+        json=dict(session_config_name=configName, num_participants=numParticipants),
+        headers=headers,
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    sessionCode = response.json()['code']
+    return sessionCode, participant_codes(server, sessionCode, restKey)
+
+
+def open_live_page(server, participantCode):
+    """Load the participant's first page; returns the websocket url of its live socket"""
+    response = requests.get(f'{server}/InitializeParticipant/{participantCode}', timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    match = SOCKET_URL.search(response.text)
+    if not match:
+        raise RuntimeError(f'{response.url} is not a live page')
+    scheme = 'wss' if urlparse(server).scheme == 'https' else 'ws'
+    return f'{scheme}://{urlparse(server).netloc}{html.unescape(match.group(1))}'
+
+
+########################################################
+# Participants                                         #
+########################################################
+
+class LiveParticipant:
+
+    def __init__(self, socketUrl, timings, rng, posEvery=6, posSamples=5, textEvery=15, burst=3):
+        self.socketUrl = socketUrl
+        self.timings = timings
+        self.rng = rng
+        self.posEvery = posEvery
+        self.posSamples = posSamples
+        self.textEvery = textEvery
+        self.burst = burst
+
+        # send times of requests still waiting for a reply, keyed by (reply event, match key)
+        self.pending = defaultdict(deque)
+        # NPCs whose current reply has already started streaming
+        self.streaming = set()
+        self.npcPositions = {}
+        self.position = dict(x=0, y=2, z=0)
+        self.sent = 0
+        self.ready = asyncio.Event()
+
+    async def run(self, duration):
+        async with websockets.connect(self.socketUrl, max_size=None) as socket:
+            self.socket = socket
+            receiver = asyncio.create_task(self.receive())
+
+            await self.send(dict(event='phase', phase=0), ('phase', None))
+            await asyncio.wait_for(self.ready.wait(), REQUEST_TIMEOUT)
+
+            until = time.monotonic() + duration
+            await asyncio.gather(self.move(until), self.talk(until))
+
+            # wait for outstanding replies, then count whatever is still missing as errors
+            drainUntil = time.monotonic() + DRAIN_SECONDS
+            while any(self.pending.values()) and time.monotonic() < drainUntil and not receiver.done():
+                await asyncio.sleep(0.2)
+            receiver.cancel()
+
+        for (event, _), sentTimes in self.pending.items():
+            for _ in sentTimes:
+                self.timings.error(self.label(event))
+
+    async def send(self, message, expect=None):
+        if expect:
+            self.pending[expect].append(time.perf_counter())
+        self.sent += 1
+        await self.socket.send(json.dumps(message))
+
+    async def move(self, until):
+        """Wander around the room, sending a batch of position samples every posEvery seconds"""
+        while time.monotonic() < until:
+            await asyncio.sleep(self.posEvery * self.rng.uniform(0.9, 1.1))
+            samples = []
+            for _ in range(self.posSamples):
+                self.position = dict(
+                    x=self.position['x'] + self.rng.uniform(-1, 1),
+                    y=self.position['y'],
+                    z=self.position['z'] + self.rng.uniform(-1, 1),
+                )
+                samples.append(dict(pos=self.position, t=time.time()))
+            ack = self.sent
+            await self.send(dict(event='posCheck', samples=samples, sent=time.time(), ack=ack), ('posAck', ack))
+
+    async def talk(self, until):
+        """Walk up to a random NPC every textEvery seconds (on average) and send it a burst of messages"""
+        while True:
+            await asyncio.sleep(self.rng.expovariate(1 / self.textEvery))
+            if time.monotonic() >= until:
+                return
+            npcPosition = self.npcPositions[self.rng.choice(sorted(self.npcPositions))]
+            self.position = dict(
+                x=npcPosition['x'] + self.rng.uniform(-TALK_OFFSET, TALK_OFFSET),
+                y=npcPosition['y'],
+                z=npcPosition['z'] + self.rng.uniform(-TALK_OFFSET, TALK_OFFSET),
+            )
+            for _ in range(self.rng.randint(1, self.burst)):
+                text = f'Did you see anything unusual? ({self.sent})'
+                await self.send(dict(event='text', text=text, pos=self.position), ('text', text))
+                await asyncio.sleep(self.rng.uniform(0.5, 2))
+
+    async def receive(self):
+        async for raw in self.socket:
+            data = json.loads(raw)
+            event = data.get('event')
+            if event == 'phase':
+                self.reply('phase', None)
+                for npc in ('Red', 'Black', 'Green'):
+                    self.npcPositions[npc] = {k: float(v) for k, v in json.loads(data[f'pos{npc}']).items()}
+                self.position = {k: float(v) for k, v in json.loads(data['posPlayer']).items()}
+                self.ready.set()
+            elif event == 'posAck':
+                self.reply('posAck', data['ack'])
+            elif event == 'text':
+                self.reply('text', data['selfText'])
+                # chat.html asks the nearby NPC for a reply straight away
+                if data.get('target'):
+                    target = data['target']
+                    self.pending[('botDelta', target)].append(time.perf_counter())
+                    await self.send(dict(event='botMsg', botId=target), ('botText', target))
+            elif event == 'botDelta':
+                if data['sender'] not in self.streaming:
+                    self.streaming.add(data['sender'])
+                    self.reply('botDelta', data['sender'])
+            elif event == 'botText':
+                if data['sender'] not in self.streaming:
+                    # reply arrived in one piece
+                    self.reply('botDelta', data['sender'], record=False)
+                self.streaming.discard(data['sender'])
+                self.reply('botText', data['sender'])
+
+    def reply(self, event, key, record=True):
+        sentTimes = self.pending.get((event, key))
+        if sentTimes:
+            sentAt = sentTimes.popleft()
+            if record:
+                self.timings.record(self.label(event), time.perf_counter() - sentAt)
+
+    @staticmethod
+    def label(event):
+        return dict(
+            phase='phase',
+            posAck='posCheck',
+            text='text',
+            botDelta='botMsg (first delta)',
+            botText='botMsg (full reply)',
+        )[event]
+
+
+async def run_participants(socketUrls, timings, duration, ramp, seed, **options):
+    async def play(index, socketUrl):
+        # spread the starts over the ramp-up period
+        await asyncio.sleep(ramp * index / len(socketUrls))
+        participant = LiveParticipant(socketUrl, timings, random.Random(f'{seed}-{index}'), **options)
+        try:
+            await participant.run(duration)
+            return True
+        except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as exc:
+            print(f'Participant {index + 1}: {exc.__class__.__name__} {exc}')
+            timings.error('connection')
+            return False
+
+    return await asyncio.gather(*(play(i, url) for i, url in enumerate(socketUrls)))
+
+
+def run(server, configName, numParticipants, restKey=None, duration=50, ramp=0, seed=0, **options):
+    server = server.rstrip('/')
+    sessionCode, participantCodes = create_session(server, configName, numParticipants, restKey)
+    print(f'Session {sessionCode}: {len(participantCodes)} participants')
+    socketUrls = [open_live_page(server, code) for code in participantCodes]
+
+    timings = Timings()
+    finished = asyncio.run(run_participants(socketUrls, timings, duration, ramp, seed, **options))
+    timings.stop()
+
+    print(timings.report('event'))
+    print(f'{sum(finished)} of {len(finished)} participants stayed connected')
+    return all(finished)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay threejs chat traffic over many live sockets and report round trips')
+    parser.add_argument('session_config', help='name of a session config with the threejs app')
+    parser.add_argument('participants', type=int, help='number of concurrent participants')
+    parser.add_argument('--server', default='http://localhost:8000', help='base url of the running server')
+    parser.add_argument('--rest-key', default=environ.get('OTREE_REST_KEY'), help='REST key (default: $OTREE_REST_KEY)')
+    parser.add_argument('--duration', type=float, default=50, help='seconds each participant stays on the page (default 50)')
+    parser.add_argument('--ramp', type=float, default=0, help='seconds over which participants connect (default 0)')
+    parser.add_argument('--pos-every', type=float, default=6, help='seconds between posCheck messages (default 6)')
+    parser.add_argument('--pos-samples', type=int, default=5, help='position samples per posCheck (default 5)')
+    parser.add_argument('--text-every', type=float, default=15, help='mean seconds between text bursts (default 15)')
+    parser.add_argument('--burst', type=int, default=3, help='most texts in one burst (default 3)')
+    parser.add_argument('--seed', default=0, help='change to get a different but still repeatable run')
+    args = parser.parse_args()
+
+    ok = run(
+        args.server, args.session_config, args.participants, args.rest_key,
+        duration=args.duration, ramp=args.ramp, seed=args.seed,
+        posEvery=args.pos_every, posSamples=args.pos_samples, textEvery=args.text_every, burst=args.burst,
+    )
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
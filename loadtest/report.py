@@ -0,0 +1,76 @@
+"""
+Latency bookkeeping and the summary table printed at the end of a load test
+"""
+
+from collections import defaultdict
+import math
+import threading
+import time
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of a list of numbers, e.g. share=0.95 for p95"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+class Timings:
+    """Thread-safe collection of request durations, grouped by a label such as 'GET budgeting/Consent'"""
+
+    def __init__(self):
+        self._durations = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, label, seconds):
+        with self._lock:
+            self._durations[label].append(seconds)
+
+    def error(self, label):
+        with self._lock:
+            self._errors[label] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def rows(self):
+        """One dict per label with count, errors and p50/p95/p99/max in milliseconds"""
+        with self._lock:
+            labels = sorted(set(self._durations) | set(self._errors))
+            rows = []
+            for label in labels:
+                durations = self._durations.get(label, [])
+                row = dict(label=label, count=len(durations), errors=self._errors.get(label, 0))
+                for name, share in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1)):
+                    value = percentile(durations, share)
+                    row[name] = None if value is None else value * 1000
+                rows.append(row)
+        return rows
+
+    def report(self, title):
+        """Summary table: per-label latency percentiles, then overall throughput"""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        rows = self.rows()
+        total = sum(row['count'] for row in rows)
+        errors = sum(row['errors'] for row in rows)
+        width = max([len(row['label']) for row in rows] + [len(title)])
+
+        lines = [
+            f'{title:<{width}}  {"n":>6}  {"err":>4}  {"p50 ms":>8}  {"p95 ms":>8}  {"p99 ms":>8}  {"max ms":>8}',
+        ]
+        for row in rows:
+            values = ''.join(
+                f'  {"-":>8}' if row[name] is None else f'  {row[name]:>8.1f}'
+                for name in ('p50', 'p95', 'p99', 'max')
+            )
+            lines.append(f'{row["label"]:<{width}}  {row["count"]:>6}  {row["errors"]:>4}{values}')
+        lines.append('')
+        lines.append(
+            f'{total} requests, {errors} errors in {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else 0:.1f} req/s)'
+        )
+        return '\n'.join(lines)
@@ -0,0 +1,107 @@
+"""
+Vectorised accuracy scoring for the budgeting apps
+
+The pages score one participant at a time as they submit. For analysis it is
+often necessary to score a whole session again, e.g. against a revised
+target_year_actual. score_session does that in three steps whatever the size
+of the session: one query for the forecast columns of every player, one NumPy
+pass over all rounds, and one bulk UPDATE of the accuracy fields:
+    actual_expense      actual expense the round was scored against
+    initial_accuracy    absolute % deviation of the initial budget (forecast + buffer)
+    final_accuracy      same for the final budget (the revision, if the participant revised)
+    advisor_accuracy    same for the advisor's recommended budget
+The arrays are also returned, together with the revision delta (final minus
+initial budget) of each player.
+
+The update bypasses the ORM, so call it from a script or the rescore command
+(python -m scoring.rescore), not from page code that has the same players loaded.
+"""
+
+import numpy as np
+from otree.database import db
+
+# player fields written by score_session
+SCORE_FIELDS = ['actual_expense', 'initial_accuracy', 'final_accuracy', 'advisor_accuracy']
+
+
+def accuracy(budgets, actuals):
+    """Absolute % deviation of budgets from actuals, rounded to 2 decimals and 0 where the actual is 0"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviation = np.round(np.abs((budgets - actuals) / actuals) * 100, 2)
+    return np.where(actuals == 0, 0, deviation)
+
+
+def by_round(values, roundNumbers):
+    """Look up a {round_number: value} dict for an array of round numbers"""
+    lookup = np.full(max(max(values), roundNumbers.max(initial=0)) + 1, np.nan)
+    lookup[list(values)] = list(values.values())
+    return lookup[roundNumbers]
+
+
+def score_session(Player, session, actuals, advisorBudgets, revisions=None):
+    """Score every player of a session who made a forecast and bulk-update their accuracy fields
+
+    actuals and advisorBudgets map round numbers to the actual expense and the
+    advisor's recommended budget (estimate + buffer). The resubmission decision,
+    revised forecast and revised buffer are read from each player's own fields,
+    unless revisions maps (participant_id, round_number) to them, for apps that
+    store them elsewhere. Returns a dict of arrays, one entry per scored player.
+    """
+    if revisions is None:
+        revisionColumns = [Player.resubmit_decision, Player.revised_forecast, Player.revised_adjustment]
+    else:
+        revisionColumns = [Player.participant_id]
+    rows = (
+        Player.objects_filter(session=session)
+        .filter(Player.initial_forecast.isnot(None))
+        .with_entities(
+            Player.id,
+            Player.round_number,
+            Player.initial_forecast,
+            Player.budget_adjustment,
+            *revisionColumns,
+        )
+        .order_by(Player.id)
+        .all()
+    )
+    if revisions is not None:
+        rows = [
+            row[:4] + tuple(revisions.get((row[4], row[1]), (None, None, None)))
+            for row in rows
+        ]
+    # missing values (e.g. no revision) become NaN
+    columns = np.array(rows, dtype=float).reshape(-1, 7).T
+    playerIds, roundNumbers = columns[0].astype(int), columns[1].astype(int)
+    forecast, adjustment, resubmit, revisedForecast, revisedAdjustment = columns[2:]
+
+    initialBudget = forecast + adjustment
+    revised = (resubmit == 1) & ~np.isnan(revisedForecast)
+    finalBudget = np.where(revised, revisedForecast + np.nan_to_num(revisedAdjustment), initialBudget)
+    actual = by_round(actuals, roundNumbers)
+    advisorBudget = by_round(advisorBudgets, roundNumbers)
+
+    scores = dict(
+        actual_expense=actual,
+        initial_accuracy=accuracy(initialBudget, actual),
+        final_accuracy=accuracy(finalBudget, actual),
+        advisor_accuracy=accuracy(advisorBudget, actual),
+    )
+
+    # NaN (a round without an actual, a missing buffer) is stored as an empty field
+    mappings = [dict(id=playerId) for playerId in playerIds.tolist()]
+    for field in SCORE_FIELDS:
+        # actual_expense is an IntegerField
+        convert = int if field == 'actual_expense' else float
+        for mapping, value in zip(mappings, scores[field].tolist()):
+            mapping[field] = None if np.isnan(value) else convert(value)
+    db._db.bulk_update_mappings(Player, mappings)
+
+    return dict(
+        player_id=playerIds,
+        round_number=roundNumbers,
+        initial_budget=initialBudget,
+        final_budget=finalBudget,
+        revised=revised,
+        revision_delta=finalBudget - initialBudget,
+        **scores,
+    )
@@ -0,0 +1,56 @@
+"""
+Re-score a budgeting session in the database
+
+Run from the project folder, against the same database as the server
+(DATABASE_URL), e.g. after a category's actual expense was revised:
+    python -m scoring.rescore budgeting_multiround abcd1234
+    python -m scoring.rescore budgeting_multiround abcd1234 --actual 2=180
+    python -m scoring.rescore budgeting_roles abcd1234 --actual 1=160
+Prints the mean accuracies per round after the update.
+"""
+
+import argparse
+import importlib
+
+import numpy as np
+
+
+def parse_actual(text):
+    roundNumber, actual = text.split('=')
+    return int(roundNumber), int(actual)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score every player of a budgeting session in one pass')
+    parser.add_argument('app', help='budgeting_multiround or budgeting_roles')
+    parser.add_argument('session_code', help='code of the session to re-score')
+    parser.add_argument('--actual', type=parse_actual, action='append', default=[], metavar='ROUND=EXPENSE',
+                        help="score a round against this actual expense instead of the app's target_year_actual")
+    args = parser.parse_args()
+
+    # oTree needs settings.py and the database before the app can be imported
+    from otree.main import setup
+    setup()
+    from otree.database import session_scope
+    from otree.models import Session
+
+    app = importlib.import_module(args.app)
+    with session_scope():
+        session = Session.objects_get(code=args.session_code)
+        result = app.rescore_session(session, dict(args.actual))
+
+    print(f'Scored {len(result["player_id"])} players in session {args.session_code}')
+    print(f'{"round":>5} {"n":>5} {"actual":>7} {"initial %":>10} {"final %":>8} {"advisor %":>10} {"revised":>8}')
+    for roundNumber in np.unique(result['round_number']):
+        rows = result['round_number'] == roundNumber
+        print(
+            f'{roundNumber:>5} {rows.sum():>5} {result["actual_expense"][rows][0]:>7.0f}'
+            f' {np.nanmean(result["initial_accuracy"][rows]):>10.2f}'
+            f' {np.nanmean(result["final_accuracy"][rows]):>8.2f}'
+            f' {np.nanmean(result["advisor_accuracy"][rows]):>10.2f}'
+            f' {result["revised"][rows].sum():>8}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -74,14 +74,10 @@ SESSION_CONFIG_DEFAULTS = dict(
 PARTICIPANT_FIELDS = [
     'failed_knowledge_check',  # Tracks whether the participant failed the knowledge check
     'part_id',                # Tracks participant ID
-    '_start_time',            # Used for tracking page timing
-    '_page_start',            # Generic page timing field
-    '_forecast_start',        # Timing for forecast page
-    '_advice_start',          # Timing for advice page
-    '_resubmission_start',    # Timing for resubmission page
-    '_results_start',         # Timing for results page
+    'page_timing',            # First render and submit time of each page (see timing.TimedPage)
     'role_condition',         # Role condition (stored for multi-round access)
     'advice_condition',       # Advice condition (stored for multi-round access)
+    'round_summaries',        # Per-round forecast summary in budgeting_multiround (see build_round_summaries)
     'construal_level',        # Construal level from budgeting study
     'budgeting_participant_code',  # Participant code from budgeting study
     'completed_budgeting',    # Whether participant completed budgeting study
@@ -1,7 +1,7 @@
 from otree.api import *
+from timing import TimedPage, export_page_times
 import random
 import string  # Missing import for string module
-import time  # Import time module for tracking time spent on pages
 
 doc = """
 Single player variant of the investment game. The player acts as an investor
@@ -260,18 +260,6 @@ class Player(BasePlayer):
         doc="JSON string containing all risk descriptions"
     )
 
-    # Page timing fields
-    consent_page_time = models.FloatField(doc="Time spent on consent page in seconds")
-    introduction_page_time = models.FloatField(doc="Time spent on introduction page in seconds")
-    background_page_time = models.FloatField(doc="Time spent on background page in seconds")
-    condition1_page_time = models.FloatField(doc="Time spent on condition 1 page in seconds")
-    condition2_page_time = models.FloatField(doc="Time spent on condition 2 page in seconds")
-    assessment_page_time = models.FloatField(doc="Time spent on assessment page in seconds")
-    manip_check_page_time = models.FloatField(doc="Time spent on manipulation check page in seconds")
-    controls_page_time = models.FloatField(doc="Time spent on controls page in seconds")
-    demographics_page_time = models.FloatField(doc="Time spent on demographics page in seconds")
-    thanks_page_time = models.FloatField(doc="Time spent on thanks page in seconds")
-
 # --- Functions ----------------------------------------------------------------
 
 # Function for testing
@@ -297,21 +285,13 @@ def creating_session(subsession: Subsession):
 
 # --- Pages --------------------------------------------------------------------
 
-class Consent(Page):
+class Consent(TimedPage):
     form_model = 'player'
     form_fields = ['declined_consent']
+    timing_name = 'consent'
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        import time
-        player.consent_page_time = time.time() - player.participant._start_time
-        
         # Log consent decision
         if player.declined_consent:
             print(f"Participant {player.participant.label}: Declined consent")
@@ -356,57 +336,35 @@ class ScreenedOut(Page):
             rejection_url='https://app.prolific.com/submissions/complete?cc=C1ANUFSO'
         )
 
-class Introduction(Page):
+class Introduction(TimedPage):
+    timing_name = 'introduction'
+
     @staticmethod
     def is_displayed(player: Player):
         # Only show this page if participant passed screening
         return player.passed_screening
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        import time
-        player.introduction_page_time = time.time() - player.participant._start_time
-    
     @staticmethod
     def before_next_page(self, timeout_happened):
         self.prolific_id = self.participant.label
 pass
 
-class Background(Page):
+class Background(TimedPage):
+    timing_name = 'background'
+
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.background_page_time = time.time() - player.participant._start_time
 
-class CLT_Condition(Page):
+class CLT_Condition(TimedPage):
     form_model = 'player'
     form_fields = ['construal_response']
+    timing_name = 'condition1'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def vars_for_template(player: Player):
         return dict(
@@ -415,32 +373,26 @@ class CLT_Condition(Page):
     
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        player.condition1_page_time = time.time() - player.participant._start_time
         # Log the construal response
         print(f"Participant {player.participant.label}: Construal response = {player.construal_response}")
 
-class Assessment(Page):
+class Assessment(TimedPage):
     form_model = 'player'
     form_fields = ['risk_count', 'risk_descriptions']
+    timing_name = 'assessment'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        # Save timing
-        player.assessment_page_time = time.time() - player.participant._start_time
         # Log the number of risks identified
         print(f"Participant {player.participant.label}: Identified {player.risk_count} risks")
 
-class Spec_Condition(Page):
+class Spec_Condition(TimedPage):
+    timing_name = 'condition2'
+
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
@@ -450,17 +402,8 @@ class Spec_Condition(Page):
         return dict(
             speculative_design=player.speculative_design,
         )
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-    
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.condition2_page_time = time.time() - player.participant._start_time
 
-class Mediators(Page):
+class Mediators(TimedPage):
     form_model = 'player'
     form_fields = [
         'creative_thinking',
@@ -473,42 +416,27 @@ class Mediators(Page):
         'impact_feeling',
         'mental_experience',
     ]
+    timing_name = 'mediators'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
- 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.controls_page_time = time.time() - player.participant._start_time
-
-class Manip_Check(Page):
+class Manip_Check(TimedPage):
     form_model = 'player'
     form_fields = ['video_check', 'construal_check']
+    timing_name = 'manip_check'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        player.manip_check_page_time = time.time() - player.participant._start_time
         # Log manipulation check responses
         print(f"Participant {player.participant.label}: Video check = {player.video_check}, Construal check = {player.construal_check}")
 
-class Controls(Page):
+class Controls(TimedPage):
     form_model = 'player'
     form_fields = [
         'risk_taking', 
@@ -517,22 +445,13 @@ class Controls(Page):
         'manipulation_effort',
         'manipulation_difficulty',
     ]
+    timing_name = 'controls'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.controls_page_time = time.time() - player.participant._start_time
-
-class Demographics(Page):
+class Demographics(TimedPage):
     form_model = 'player'
     form_fields = [
         'gender',
@@ -543,24 +462,16 @@ class Demographics(Page):
         'industry_experience',
         'professional_background',
     ]
+    timing_name = 'demographics'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.demographics_page_time = time.time() - player.participant._start_time
-
-class Thanks(Page):
+class Thanks(TimedPage):
     form_model = 'player'
     form_fields = ['feedback']  # Capture feedback in the database
+    timing_name = 'thanks'
     
     @staticmethod
     def is_displayed(player: Player):
@@ -574,8 +485,6 @@ class Thanks(Page):
 
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        # Save timing
-        player.thanks_page_time = time.time() - player.participant._start_time
         # Save feedback to the database
         feedback = player.feedback
         if feedback:
@@ -611,4 +520,10 @@ page_sequence = [
     Demographics,
     Thanks,
     Redirect
-]
\ No newline at end of file
+]
+
+
+# --- Export -------------------------------------------------------------------
+
+def custom_export(players):
+    yield from export_page_times(players, page_sequence)
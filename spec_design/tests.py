@@ -0,0 +1,51 @@
+from otree.api import Currency as cu, currency_range, expect, Bot, Submission, SubmissionMustFail
+import json
+from . import *
+
+
+SCREENING_ANSWERS = dict(
+    screening_q1='Planning, research, and initial design activities before product launch',
+    screening_q2='Proactively identifying potential issues before they materialize',
+    screening_q3='Multiple types including ethical, safety, regulatory, and social risks',
+)
+
+
+class PlayerBot(Bot):
+    cases = ['passes_screening', 'screened_out']
+
+    def play_round(self):
+        yield Consent, dict(declined_consent=False)
+
+        if self.case == 'screened_out':
+            # a wrong screening answer ends the study on ScreenedOut
+            yield Screening, dict(SCREENING_ANSWERS, screening_q3='Only patient safety risks')
+            expect(self.player.passed_screening, False)
+            return
+
+        yield Screening, SCREENING_ANSWERS
+        expect(self.player.passed_screening, True)
+
+        yield Introduction
+        yield Background
+        yield Spec_Condition
+        yield CLT_Condition, dict(construal_response='Bot response to the construal task.')
+        yield Assessment, dict(
+            risk_count=2,
+            risk_descriptions=json.dumps(['Bot risk one', 'Bot risk two']),
+        )
+        yield Manip_Check, dict(
+            video_check=self.player.speculative_design,
+            construal_check=self.player.construal_level,
+        )
+        yield Mediators, {field: 4 for field in Mediators.form_fields}
+        yield Controls, {field: 4 for field in Controls.form_fields}
+        yield Demographics, dict(
+            gender='Prefer not to say',
+            age='25-34 years',
+            qualification='Masters Degree',
+            work_experience=5,
+            rm_experience=1,
+            industry_experience=2,
+            professional_background='Bot background.',
+        )
+        yield Thanks, dict(feedback='')
@@ -1,7 +1,7 @@
 from otree.api import *
+from timing import TimedPage, export_page_times
 import random
 import string  # Missing import for string module
-import time  # Import time module for tracking time spent on pages
 
 doc = """
 Single player variant of the investment game. The player acts as an investor
@@ -346,22 +346,6 @@ class Player(BasePlayer):
         doc="JSON string containing all risk descriptions"
     )
 
-    # Page timing fields
-    consent_page_time = models.FloatField(doc="Time spent on consent page in seconds")
-    screening_page_time = models.FloatField(doc="Time spent on screening page in seconds")
-    introduction_page_time = models.FloatField(doc="Time spent on introduction page in seconds")
-    background_page_time = models.FloatField(doc="Time spent on background page in seconds")
-    scenario_check_page_time = models.FloatField(doc="Time spent on scenario check page in seconds")
-    clt_condition_page_time = models.FloatField(doc="Time spent on construal level condition page in seconds")
-    spec_condition_page_time = models.FloatField(doc="Time spent on speculative design condition page in seconds")
-    assessment_page_time = models.FloatField(doc="Time spent on assessment page in seconds")
-    mediators_page_time = models.FloatField(doc="Time spent on mediators page in seconds")
-    controls_page_time = models.FloatField(doc="Time spent on controls page in seconds")
-    characteristics_page_time = models.FloatField(doc="Time spent on characteristics page in seconds")
-    manip_check_page_time = models.FloatField(doc="Time spent on manipulation check page in seconds")
-    demographics_page_time = models.FloatField(doc="Time spent on demographics page in seconds")
-    thanks_page_time = models.FloatField(doc="Time spent on thanks page in seconds")
-
 # --- Functions ----------------------------------------------------------------
 
 # Function for testing
@@ -392,21 +376,13 @@ def creating_session(subsession: Subsession):
 
 # --- Pages --------------------------------------------------------------------
 
-class Consent(Page):
+class Consent(TimedPage):
     form_model = 'player'
     form_fields = ['declined_consent']
+    timing_name = 'consent'
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        import time
-        player.consent_page_time = time.time() - player.participant._start_time
-        
         # Parse budgeting participant code and construal level from URL parameter
         # Format: participant_label = CODE_CONSTRUAL (e.g., "abc123_concrete")
         if player.participant.label and '_' in player.participant.label:
@@ -431,15 +407,10 @@ class Consent(Page):
         else:
             print(f"Participant {player.participant.label}: Accepted consent")
 
-class Screening(Page):
+class Screening(TimedPage):
     form_model = 'player'
     form_fields = ['screening_q1', 'screening_q2', 'screening_q3']
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
+    timing_name = 'screening'
     
     @staticmethod
     def error_message(player: Player, values):
@@ -464,7 +435,6 @@ class Screening(Page):
     
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        player.screening_page_time = time.time() - player.participant._start_time
         # Always mark as passed since they can't proceed without correct answers
         player.passed_screening = True
         print(f"Participant {player.participant.label}: Passed screening")
@@ -482,57 +452,35 @@ class ScreenedOut(Page):
             rejection_url='https://app.prolific.com/submissions/complete?cc=C1ANUFSO'
         )
 
-class Introduction(Page):
+class Introduction(TimedPage):
+    timing_name = 'introduction'
+
     @staticmethod
     def is_displayed(player: Player):
         # Only show this page if participant passed screening
         return player.passed_screening
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        import time
-        player.introduction_page_time = time.time() - player.participant._start_time
-    
     @staticmethod
     def before_next_page(self, timeout_happened):
         self.prolific_id = self.participant.label
 pass
 
-class Background(Page):
+class Background(TimedPage):
+    timing_name = 'background'
+
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.background_page_time = time.time() - player.participant._start_time
-
-class ScenarioCheck(Page):
+class ScenarioCheck(TimedPage):
     form_model = 'player'
     form_fields = ['scenario_q1', 'scenario_q2', 'scenario_q3']
+    timing_name = 'scenario_check'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-    
     @staticmethod
     def error_message(player: Player, values):
         errors = []
@@ -548,25 +496,16 @@ class ScenarioCheck(Page):
         
         if errors:
             return 'Some answers are incorrect. Please review the scenario and try again: ' + ' '.join(errors)
-    
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.scenario_check_page_time = time.time() - player.participant._start_time
 
-class CLT_Condition(Page):
+class CLT_Condition(TimedPage):
     form_model = 'player'
     form_fields = ['construal_response']
+    timing_name = 'clt_condition'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def vars_for_template(player: Player):
         return dict(
@@ -575,32 +514,26 @@ class CLT_Condition(Page):
     
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        player.clt_condition_page_time = time.time() - player.participant._start_time
         # Log the construal response
         print(f"Participant {player.participant.label}: Construal response = {player.construal_response}")
 
-class Assessment(Page):
+class Assessment(TimedPage):
     form_model = 'player'
     form_fields = ['risk_count', 'risk_descriptions']
+    timing_name = 'assessment'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        # Save timing
-        player.assessment_page_time = time.time() - player.participant._start_time
         # Log the number of risks identified
         print(f"Participant {player.participant.label}: Identified {player.risk_count} risks")
 
-class Spec_Condition(Page):
+class Spec_Condition(TimedPage):
+    timing_name = 'spec_condition'
+
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
@@ -610,17 +543,8 @@ class Spec_Condition(Page):
         return dict(
             speculative_design=player.speculative_design,
         )
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-    
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.spec_condition_page_time = time.time() - player.participant._start_time
 
-class Mediators(Page):
+class Mediators(TimedPage):
     form_model = 'player'
     form_fields = [
         'scenario_creativity',
@@ -628,6 +552,7 @@ class Mediators(Page):
         'risk_tangibility',
         'mediator_attention_check',
     ]
+    timing_name = 'mediators'
     
     @staticmethod
     def is_displayed(player: Player):
@@ -638,43 +563,28 @@ class Mediators(Page):
         if values['mediator_attention_check'] != 6:  # 6 corresponds to 'Agree'
             return 'Question 4 is incorrect. Please review and try again.'
 
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
- 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.mediators_page_time = time.time() - player.participant._start_time
-
-class Manip_Check(Page):
+class Manip_Check(TimedPage):
     form_model = 'player'
     form_fields = ['specdesign_check', 'construal_check']
+    timing_name = 'manip_check'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        player.manip_check_page_time = time.time() - player.participant._start_time
         # Log manipulation check responses
         print(f"Participant {player.participant.label}: Specdesign check = {player.specdesign_check}, Construal check = {player.construal_check}")
 
-class Controls(Page):
+class Controls(TimedPage):
     form_model = 'player'
     form_fields = [
         'manipulation_effort',
         'manipulation_difficulty',
         'attention_check',
     ]
+    timing_name = 'controls'
     
     @staticmethod
     def is_displayed(player: Player):
@@ -684,40 +594,21 @@ class Controls(Page):
     def error_message(player: Player, values):
         if values['attention_check'] != 6:  # 6 corresponds to 'Agree'
             return 'Question 3 is incorrect. Please review and try again.'
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
 
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.controls_page_time = time.time() - player.participant._start_time
-
-class Characteristics(Page):
+class Characteristics(TimedPage):
     form_model = 'player'
     form_fields = [
         'risk_taking', 
         'risk_avoidance',
         'creativity',
     ]
+    timing_name = 'characteristics'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.characteristics_page_time = time.time() - player.participant._start_time
 
-class Demographics(Page):
+class Demographics(TimedPage):
     form_model = 'player'
     form_fields = [
         'qualification',
@@ -727,24 +618,16 @@ class Demographics(Page):
         'familiarity_insurance',
         'familiarity_ai',
     ]
+    timing_name = 'demographics'
     
     @staticmethod
     def is_displayed(player: Player):
         return player.passed_screening
-    
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
-    @staticmethod
-    def before_next_page(player: Player, timeout_happened):
-        player.demographics_page_time = time.time() - player.participant._start_time
 
-class Thanks(Page):
+class Thanks(TimedPage):
     form_model = 'player'
     form_fields = ['prize_email', 'feedback']  # Capture email and feedback in the database
+    timing_name = 'thanks'
     
     @staticmethod
     def is_displayed(player: Player):
@@ -756,16 +639,8 @@ class Thanks(Page):
             participant_id=player.participant.part_id
         )
     
-    @staticmethod
-    def get_timeout_seconds(player: Player):
-        import time
-        player.participant._start_time = time.time()
-        return None
-
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
-        # Save timing
-        player.thanks_page_time = time.time() - player.participant._start_time
         # Save feedback to the database
         feedback = player.feedback
         if feedback:
@@ -795,4 +670,10 @@ page_sequence = [
     Demographics,
     Thanks,
     Redirect
-]
\ No newline at end of file
+]
+
+
+# --- Export -------------------------------------------------------------------
+
+def custom_export(players):
+    yield from export_page_times(players, page_sequence)
@@ -0,0 +1,62 @@
+from otree.api import Currency as cu, currency_range, expect, Bot, Submission, SubmissionMustFail
+import json
+from . import *
+
+
+SCREENING_ANSWERS = dict(
+    screening_q1='Planning, research, and initial design activities before product launch',
+    screening_q2='Proactively identifying potential issues before they materialize',
+    screening_q3='Multiple types including ethical, safety, regulatory, and social risks',
+)
+
+SCENARIO_ANSWERS = dict(
+    scenario_q1='To provide coverage when AI or GenAI systems cause harm',
+    scenario_q2='Businesses and individuals',
+    scenario_q3='AI Profit Guarantee',
+)
+
+
+class PlayerBot(Bot):
+
+    def play_round(self):
+        yield Consent, dict(declined_consent=False)
+
+        # participants have to retry the screening until every answer is correct
+        yield SubmissionMustFail(Screening, dict(SCREENING_ANSWERS, screening_q3='Only customer safety risks'))
+        yield Screening, SCREENING_ANSWERS
+        expect(self.player.passed_screening, True)
+
+        yield Introduction
+        yield Background
+        yield SubmissionMustFail(ScenarioCheck, dict(SCENARIO_ANSWERS, scenario_q2='Only AI developers'))
+        yield ScenarioCheck, SCENARIO_ANSWERS
+        yield CLT_Condition, dict(construal_response='Bot response to the construal task.')
+        yield Spec_Condition
+        yield Assessment, dict(
+            risk_count=2,
+            risk_descriptions=json.dumps(['Bot risk one', 'Bot risk two']),
+        )
+        expect(self.player.risk_count, 2)
+
+        yield SubmissionMustFail(Mediators, dict(
+            scenario_creativity=5, risk_accessibility=5, risk_tangibility=5, mediator_attention_check=4,
+        ))
+        yield Mediators, dict(
+            scenario_creativity=5, risk_accessibility=5, risk_tangibility=5, mediator_attention_check=6,
+        )
+        yield SubmissionMustFail(Controls, dict(manipulation_effort=3, manipulation_difficulty=3, attention_check=7))
+        yield Controls, dict(manipulation_effort=3, manipulation_difficulty=3, attention_check=6)
+        yield Characteristics, dict(risk_taking=4, risk_avoidance=4, creativity=5)
+        yield Manip_Check, dict(
+            specdesign_check=self.player.speculative_design,
+            construal_check=self.player.construal_level,
+        )
+        yield Demographics, dict(
+            qualification="Master's Degree",
+            work_experience=5,
+            rm_experience=1,
+            industry_experience=2,
+            familiarity_insurance=5,
+            familiarity_ai=6,
+        )
+        yield Thanks, dict(prize_email='', feedback='')
@@ -0,0 +1,46 @@
+from otree.api import Currency as cu, currency_range, expect, Bot, Submission, SubmissionMustFail
+from . import *
+
+
+SCREENING_ANSWERS = dict(
+    screening_q1='To identify and prioritize ESG issues most relevant to the business and its stakeholders',
+    screening_q2="The degree to which stakeholders are affected by or can affect a company's decisions",
+    screening_q3='The level of agreement among stakeholders on the importance of specific ESG themes',
+)
+
+
+class PlayerBot(Bot):
+    cases = ['passes_screening', 'screened_out']
+
+    def play_round(self):
+        yield Welcome, dict(declined_consent=False)
+
+        if self.case == 'screened_out':
+            # a wrong screening answer ends the study on ScreenedOut
+            yield Screening, dict(SCREENING_ANSWERS, screening_q1='To maximize short-term profits')
+            expect(self.player.passed_screening, False)
+            return
+
+        yield Screening, SCREENING_ANSWERS
+        expect(self.player.passed_screening, True)
+
+        yield Introduction
+        yield Background
+        yield Condition1
+        yield Condition2
+        yield Assessment, dict(predicted_price=42.5, justifications='Bot justification.')
+        yield Checks, dict(
+            stakeholder_attributes='High power, legitimacy, and urgency',
+            trendline='High correlation',
+        )
+        yield Mediators, dict(conflict=4, stakeholder_agreement=4, goal_alignment=4)
+        yield Controls, {field: 4 for field in Controls.form_fields}
+        yield Demographics, dict(
+            age='25-34 years old',
+            gender='Prefer not to say',
+            qualification='Masters Degree',
+            finance_experience=3,
+            professional_background='Bot background.',
+            investment_research='Neutral',
+        )
+        yield Thanks, dict(feedback='')
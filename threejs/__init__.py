@@ -2,13 +2,32 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from otree.api import *
+from otree.models import Participant, Session
+from sqlalchemy import func, literal
 from os import environ
-from openai import OpenAI
+from llm import (
+    get_client,
+    get_provider,
+    dispatch,
+    ConversationContext,
+    ResponseCache,
+    make_key,
+    partial_string_value,
+    json_schema_format,
+    parse_output,
+    usage_info,
+    get_rate_limiter,
+    with_retries,
+)
 import random
 import json
+import logging
 from pydantic import BaseModel 
 from datetime import datetime, timezone
-import math
+import time
+import base64
+import hashlib
+import numpy as np
 
 doc = """
 LLM chat with multiple agents, based on chat_complex
@@ -16,6 +35,8 @@ LLM chat with multiple agents, based on chat_complex
 
 author = 'Clint McKenna clint@calsocial.org'
 
+logger = logging.getLogger(__name__)
+
 ########################################################
 # Constants                                            #
 ########################################################
@@ -52,6 +73,20 @@ class C(BaseConstants):
     BLACK_POS = {'x': 10, 'y': 2, 'z': 12}
     GREEN_POS = {'x': 17, 'y': 2, 'z': -5}
 
+    ## how close the player must be for an NPC to respond
+    NPC_TALK_RADIUS = 10
+
+    # position telemetry
+    ## samples the client collects before sending them in one posCheck message
+    POS_BATCH_SIZE = 5
+    ## buffered samples are written once a player has this many waiting...
+    POS_FLUSH_SIZE = 20
+    ## ...or, on that player's next message, the oldest waiting sample is this many seconds old
+    POS_FLUSH_SECONDS = 30
+
+    # rows fetched per query when exporting data
+    EXPORT_CHUNK_SIZE = 1000
+
     # Debug settings (coordinates and distance lines)
     DEBUG = False
 
@@ -61,85 +96,126 @@ class C(BaseConstants):
     ## model
     MODEL = "gpt-4o-mini"
 
+    ## llm provider: 'openai', or 'local' for an offline stand-in with simulated latency (for load tests)
+    ### a session's llm_provider config overrides this
+    LLM_PROVIDER = environ.get('LLM_PROVIDER', 'openai')
+
+    ## max prompt tokens sent per bot reply (oldest messages are dropped first)
+    CONTEXT_TOKEN_BUDGET = 4000
+
+    ## reply tokens reserved per call against the tokens-per-minute limit (see llm/ratelimit.py for LLM_RPM etc.)
+    REPLY_TOKEN_ESTIMATE = 150
+
+    ## what a bot says if its reply can't be used (e.g. malformed output)
+    FALLBACK_REPLY = "Sorry, I didn't catch that. Could you say it again?"
+
+    ## send bot replies to the page as they are generated (botDelta events) instead of all at once
+    STREAM_REPLIES = True
+
+    ## response cache, enabled per session with llm_cache=True in the session config
+    ### replies are reused when model, temperature, prompt, tone and every message in the context window match
+    LLM_CACHE_SIZE = 1000
+    LLM_CACHE_TTL = 3600
+    ### optional sqlite file to keep cached replies across restarts
+    LLM_CACHE_DB = environ.get('LLM_CACHE_DB')
+
     ## set system prompt for agents
     ## according to OpenAI's documentation, this should be less than ~1500 words
-    ## set system prompt for bots
-    ### red bot
-    SYS_RED = f"""You are {BOT_LABEL1} Bot, a NPC in a virtual environment. Speak in friendly, informal language. You witnessed a theft and are helping the user investigate who is responsible. Here is what you know:
-    - The perpetrator was wearing glasses
-    - You did not see what vehicle they fled the scene in
-    - You saw the perpetrator commit the crime before 6pm
-    - You did not see if the perpetrator was a man or a woman
-    - You did not see if the perpetrator had an accomplice
+    ## every bot's system prompt is SYS_SHARED followed by SYS_NPC filled in with that bot's facts;
+    ## the shared part comes first and is identical for all bots, so providers can cache it
+    SYS_SHARED = """You are a NPC in a virtual environment. Speak in friendly, informal language. You witnessed a theft and are helping the user investigate who is responsible. You will be told below which bot you are and what you know.
 
     If the user asks something that you do not know, simply tell them you are not sure.
 
-    Each user input will be a nested list of json objects containing:
+    The conversation is given as a sequence of messages, each a json object containing:
     - their sender identifer, which shows who sent the message
-    - instructions for responding
     - tone to use
     - text you will be responding to
 
-    IMPORTANT: This list will be the entire message history between all actors in a conversation. Messages sent by you are labeled in the 'Sender' field as {BOT_LABEL1}. Other actors will be labeled differently (e.g., 'P1', 'B1', etc.).
+    The final message contains your instructions for responding.
+
+    IMPORTANT: These messages are the message history between all actors in a conversation (the oldest messages may be left out). Messages sent by you are labeled in the 'Sender' field with your bot name. Other actors will be labeled differently (e.g., 'P1', 'B1', etc.).
     
     As output, you MUST provide a json object with:
     - 'sender': your assigned sender identifier
     - 'msgId': your assigned message ID
     - 'tone': your assigned tone
     - 'text': your response (limit to 140 characters)"""
-    
-    ### black bot
-    SYS_BLACK = f"""You are {BOT_LABEL2} Bot, a NPC in a virtual environment. Speak in friendly, informal language. You witnessed a theft and are helping the user investigate who is responsible. Here is what you know:
-    - The perpetrator had a moustache
-    - You saw them leave in a blue vehicle
-    - You are not sure when the crime occurred
-    - You saw that the perpetrator was male
-    - You saw that the perpetrator was driven away by a female driver
-
-    If the user asks something that you do not know, simply tell them you are not sure.
 
-    Each user input will be a nested list of json objects containing:
-    - their sender identifer, which shows who sent the message
-    - instructions for responding
-    - tone to use
-    - text you will be responding to
+    SYS_NPC = """
 
-    IMPORTANT: This list will be the entire message history between all actors in a conversation. Messages sent by you are labeled in the 'Sender' field as {BOT_LABEL2}. Other actors will be labeled differently (e.g., 'P1', 'B1', etc.).
-    
-    As output, you MUST provide a json object with:
-    - 'sender': your assigned sender identifier
-    - 'msgId': your assigned message ID
-    - 'tone': your assigned tone
-    - 'text': your response (limit to 140 characters)"""
+    You are {label} Bot. Messages sent by you are labeled in the 'Sender' field as {label}. Here is what you know:
+{facts}"""
 
-    SYS_GREEN = f"""You are {BOT_LABEL3} Bot, a NPC in a virtual environment. Speak in friendly, informal language. You witnessed a theft and are helping the user investigate who is responsible. Here is what you know:
-    - You did not see the perpetrator's face
+    ## set bots (add entries here for more NPCs)
+    ### label -> temperature, position in the room, what the bot knows (and optionally 'model')
+    NPCS = {
+        ### red bot
+        BOT_LABEL1: dict(
+            temperature=BOT_TEMP1,
+            position=RED_POS,
+            facts="""    - The perpetrator was wearing glasses
+    - You did not see what vehicle they fled the scene in
+    - You saw the perpetrator commit the crime before 6pm
+    - You did not see if the perpetrator was a man or a woman
+    - You did not see if the perpetrator had an accomplice""",
+        ),
+        ### black bot
+        BOT_LABEL2: dict(
+            temperature=BOT_TEMP2,
+            position=BLACK_POS,
+            facts="""    - The perpetrator had a moustache
+    - You saw them leave in a blue vehicle
+    - You are not sure when the crime occurred
+    - You saw that the perpetrator was male
+    - You saw that the perpetrator was driven away by a female driver""",
+        ),
+        ### green bot
+        BOT_LABEL3: dict(
+            temperature=BOT_TEMP3,
+            position=GREEN_POS,
+            facts="""    - You did not see the perpetrator's face
     - You saw that they fled the scene in a truck
     - You saw the perpetrator commit the crime after 5:30pm
     - You did not see if the perpetrator was a man or a woman
-    - You did not see if the perpetrator had an accomplice
-
-    If the user asks something that you do not know, simply tell them you are not sure.
-
-    Each user input will be a nested list of json objects containing:
-    - their sender identifer, which shows who sent the message
-    - instructions for responding
-    - tone to use
-    - text you will be responding to
-
-    ### green bot
-    IMPORTANT: This list will be the entire message history between all actors in a conversation. Messages sent by you are labeled in the 'Sender' field as {BOT_LABEL3}. Other actors will be labeled differently (e.g., 'P1', 'B1', etc.).
-    
-    As output, you MUST provide a json object with:
-    - 'sender': your assigned sender identifier
-    - 'msgId': your assigned message ID
-    - 'tone': your assigned tone
-    - 'text': your response (limit to 140 characters)"""
+    - You did not see if the perpetrator had an accomplice""",
+        ),
+    }
 
 ########################################################
 # OpenAI Setup                                         #
 ########################################################
 
+# NPC registry, built once at import
+## bot label -> full system prompt, temperature, position and model
+def buildNPCRegistry():
+    registry = {}
+    for label, npc in C.NPCS.items():
+        registry[label] = dict(
+            label=label,
+            prompt=C.SYS_SHARED + C.SYS_NPC.format(label=label, facts=npc['facts']),
+            temperature=npc['temperature'],
+            position=npc['position'],
+            model=npc.get('model', C.MODEL),
+        )
+    return registry
+
+NPC_REGISTRY = buildNPCRegistry()
+
+# hash of the shared prompt prefix, sent as the provider's prompt cache key so requests
+# from every bot and participant are routed to the same cached prefix
+PROMPT_PREFIX_HASH = hashlib.sha256(C.SYS_SHARED.encode('utf-8')).hexdigest()[:16]
+
+# cache of bot replies (only used by sessions that opt in)
+responseCache = ResponseCache(C.LLM_CACHE_SIZE, C.LLM_CACHE_TTL, C.LLM_CACHE_DB)
+
+# plain text of a logged chat message, for cache keys
+def messageText(message):
+    try:
+        return json.loads(message['content'])['text']
+    except (TypeError, ValueError, KeyError):
+        return message['content']
+
 # specify json schema for bot messages
 class MsgOutputSchema(BaseModel):
     sender: str
@@ -147,23 +223,26 @@ class MsgOutputSchema(BaseModel):
     tone: str
     text: str
 
+# structured output format for bot replies, built once at import
+MSG_OUTPUT_FORMAT = json_schema_format(MsgOutputSchema, 'msg_output_schema')
+
 # function to run messages 
-## when triggered, this function will run the system prompt and the user message, which will contain the entire message history, rather than building on dialogue one line at a time
+## when triggered, this function will run the system prompt, the bot's conversation window (one chat message per turn, trimmed to the token budget) and the instructions for this reply
 
 # bot llm function
-def runGPT(inputMessage, tone, botLabel):
-
-    # grab bot vars from constants
-    botLabel = botLabel
-    if botLabel == C.BOT_LABEL1:
-        botTemp = C.BOT_TEMP1
-        botPrompt = C.SYS_RED
-    elif botLabel == C.BOT_LABEL2:
-        botTemp = C.BOT_TEMP2
-        botPrompt = C.SYS_BLACK
-    elif botLabel == C.BOT_LABEL3:
-        botTemp = C.BOT_TEMP3
-        botPrompt = C.SYS_GREEN
+## returns the response json and a dict of info about the call (e.g. whether it came from the cache)
+## if emit is given, the reply is streamed and emit is called with the reply text so far as it grows
+## context is a copy of the bot's window of the conversation (see getConversation)
+def runGPT(context, tone, botLabel, useCache=False, provider=None, emit=None):
+
+    # start timing the call (for metering)
+    started = time.perf_counter()
+
+    # grab bot vars from the registry
+    npc = NPC_REGISTRY[botLabel]
+    provider = get_provider(provider)
+    botTemp = npc['temperature']
+    botPrompt = npc['prompt']
 
     # assign message id and bot label
     dateNow = str(datetime.now(tz=timezone.utc).timestamp())
@@ -178,35 +257,74 @@ def runGPT(inputMessage, tone, botLabel):
             'text': Your response to the user's message in a {tone} tone (string), 
     """
 
-    # overwrite instructions for each dictionary
-    for x in inputMessage:
-        x['instructions'] = json.dumps(instructions)
-
-
-    # create input message with a nested structure
-    nestedInput = [{'role': 'user', 'content': json.dumps(inputMessage)}]
-    
-    # combine input message with assigned prompt
-    inputMsg = [{'role': 'system', 'content': botPrompt}] + nestedInput
-
-    # openai client and response creation
-    client = OpenAI(api_key=C.OPENAI_KEY)
-    response = client.chat.completions.create(
-        model=C.MODEL,
+    # build the prompt from the conversation window; instructions only go in the last message
+    inputMsg = context.messages(instructions)
+
+    # reuse a cached reply if this session opted in
+    ## the key covers every turn the model would see (not the system prompt and instructions, which carry
+    ## the new msgId), so different conversations that end the same way don't share a reply
+    cacheKey = None
+    if useCache:
+        turns = [(m['role'], messageText(m)) for m in inputMsg[1:-1]]
+        cacheKey = make_key(npc['model'], botTemp, botPrompt, turns, extra=provider + ':' + tone)
+        cachedText = responseCache.get(cacheKey)
+        if cachedText is not None:
+            msgOutput = json.dumps({'sender': botLabel, 'msgId': botMsgId, 'tone': tone, 'text': cachedText})
+            return msgOutput, dict(cacheHit=True, queueWait=0, **usage_info(npc['model'], started))
+
+    # openai (or local stand-in) client and response creation (shared, pooled client)
+    client = get_client(C.OPENAI_KEY, provider=provider)
+    request = dict(
+        model=npc['model'],
         temperature=botTemp,
         messages=inputMsg,
-        functions=[{
-            "name": "msg_output_schema",
-            "parameters": MsgOutputSchema.model_json_schema()
-        }],
-        function_call={"name": "msg_output_schema"}
+        extra_body={'prompt_cache_key': PROMPT_PREFIX_HASH},
+        response_format=MSG_OUTPUT_FORMAT,
     )
 
-    # grab text output
-    msgOutput = response.choices[0].message.function_call.arguments
-
-    # return the response json
-    return msgOutput
+    # wait for room under the shared rate limits, then call (retrying 429/5xx) while holding a concurrency slot
+    with get_rate_limiter(provider).slot(context.windowTokens + C.REPLY_TOKEN_ESTIMATE) as queueWait:
+        if emit:
+            # stream the reply, forwarding the 'text' value as it grows
+            msgOutput = ''
+            shownText = ''
+            usage = None
+            stream = with_retries(lambda: client.chat.completions.create(stream=True, stream_options={'include_usage': True}, **request))
+            for chunk in stream:
+                # the last chunk has no choices, only the token usage
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    msgOutput += delta
+                    partialText = partial_string_value(msgOutput, 'text')
+                    if partialText and partialText != shownText:
+                        shownText = partialText
+                        emit(partialText)
+        else:
+            response = with_retries(lambda: client.chat.completions.create(**request))
+            usage = response.usage
+
+            # grab text output
+            msgOutput = response.choices[0].message.content
+
+    # validate the finished reply; if it's malformed, keep whatever text we can and use the assigned values
+    def fallback(raw):
+        text = partial_string_value(raw or '', 'text') or C.FALLBACK_REPLY
+        return MsgOutputSchema(sender=botLabel, msgId=botMsgId, tone=tone, text=text)
+
+    reply = parse_output(MsgOutputSchema, msgOutput, fallback)
+    msgOutput = reply.model_dump_json()
+
+    # store the reply text for later identical requests
+    if cacheKey:
+        responseCache.set(cacheKey, reply.text)
+
+    # return the response json and the metering info
+    info = usage_info(npc['model'], started, usage, context.windowTokens, msgOutput)
+    return msgOutput, dict(cacheHit=False if useCache else None, queueWait=queueWait, **info)
 
 
 ########################################################
@@ -248,29 +366,46 @@ def initializeNPCPositions():
         'player': player_position
     }
 
-def calculate_distance(position1, position2):
-    # Convert string values to float if needed
-    x1 = float(position1['x']) if isinstance(position1['x'], str) else position1['x']
-    z1 = float(position1['z']) if isinstance(position1['z'], str) else position1['z']
-    x2 = float(position2['x']) if isinstance(position2['x'], str) else position2['x']
-    z2 = float(position2['z']) if isinstance(position2['z'], str) else position2['z']
-    
-    return math.sqrt((x1 - x2)**2 + (z1 - z2)**2)
-
-def calculate_npc_distances(player_pos):
-    """Calculate distances from player position to all NPCs
-    Args:
-        player_pos (dict): Player position with 'x', 'y', 'z' coordinates
-    Returns:
-        dict: Distances to each NPC (red, black, green)
-    """
-    return {
-        'Red': calculate_distance(player_pos, C.RED_POS),
-        'Black': calculate_distance(player_pos, C.BLACK_POS),
-        'Green': calculate_distance(player_pos, C.GREEN_POS)
-    }
+# nearest-NPC lookups on a uniform grid over the NPCs' (x, z) positions
+## cells are one talk radius wide, so only the 3x3 cells around the player can hold an NPC in range
+class ProximityIndex:
+
+    def __init__(self, positions, radius):
+        self.labels = list(positions)
+        self.coords = np.array([[float(p['x']), float(p['z'])] for p in positions.values()])
+        self.radius = radius
+
+        cells = {}
+        for i, cell in enumerate(np.floor(self.coords / radius).astype(int).tolist()):
+            cells.setdefault(tuple(cell), []).append(i)
+        self.cells = {cell: np.array(ids) for cell, ids in cells.items()}
+
+    def _point(self, pos):
+        return np.array([float(pos['x']), float(pos['z'])])
+
+    # label of the closest NPC within the radius, or None
+    def nearest(self, pos):
+        point = self._point(pos)
+        cx, cz = np.floor(point / self.radius).astype(int).tolist()
+        candidates = [
+            self.cells[(cx + dx, cz + dz)]
+            for dx in (-1, 0, 1)
+            for dz in (-1, 0, 1)
+            if (cx + dx, cz + dz) in self.cells
+        ]
+        if not candidates:
+            return None
 
+        ids = np.concatenate(candidates)
+        offsets = self.coords[ids] - point
+        dists = np.hypot(offsets[:, 0], offsets[:, 1])
+        best = dists.argmin()
+        if dists[best] > self.radius:
+            return None
+        return self.labels[ids[best]]
 
+# built once at import from the NPC positions in the registry
+npcIndex = ProximityIndex({label: npc['position'] for label, npc in NPC_REGISTRY.items()}, C.NPC_TALK_RADIUS)
 
 
 ########################################################
@@ -309,8 +444,16 @@ class Player(BasePlayer):
     # phase number
     phase = models.IntegerField(initial=0)
 
-    # cache of all messages in conversation
-    cachedMessages = models.LongStringField(initial='[]')
+    # llm usage totals for this player (per-call details are on MessageData)
+    llmCalls = models.IntegerField(initial=0)
+    llmPromptTokens = models.IntegerField(initial=0)
+    llmCompletionTokens = models.IntegerField(initial=0)
+    llmLatency = models.FloatField(initial=0)
+    llmCost = models.FloatField(initial=0)
+
+    # position samples still queued in the browser when the chat page is submitted (json, see chat.html);
+    ## they are posted with the page's form so they arrive before before_next_page writes the trace
+    pendingPositions = models.LongStringField(blank=True)
 
 ########################################################
 # Extra models                                         #
@@ -332,6 +475,47 @@ class MessageData(ExtraModel):
     # NPC target
     target = models.StringField()
 
+    # chat message as sent to the llm (the conversation log is these rows in order)
+    role = models.StringField()
+    content = models.LongStringField()
+
+    # whether a bot reply came from the response cache (empty if caching was off)
+    cacheHit = models.BooleanField()
+
+    # llm call metering for bot replies (tokens, wall time in seconds, estimated cost in USD)
+    model = models.StringField()
+    promptTokens = models.IntegerField()
+    completionTokens = models.IntegerField()
+    latency = models.FloatField()
+    cost = models.FloatField()
+    ## seconds the call waited for the rate limiter (included in latency)
+    queueWait = models.FloatField()
+
+# full conversation for a player, oldest message first
+## each message is appended once as its own row, so nothing has to be re-parsed or rewritten per event
+def getMessages(player):
+    return [{'role': m.role, 'content': m.content} for m in MessageData.filter(player=player)]
+
+# conversation windows for bot replies, keyed by player id and then bot label
+## each keeps the newest turns of the player's conversation that fit in the bot's token budget; turns are
+## appended as they are logged, so a reply doesn't rebuild its context from the whole history
+conversations = {}
+
+# a bot's window of a player's conversation (built from the log on first use, e.g. after a restart)
+def getConversation(player, botLabel):
+    windows = conversations.setdefault(player.id, {})
+    if botLabel not in windows:
+        npc = NPC_REGISTRY[botLabel]
+        windows[botLabel] = ConversationContext.from_history(
+            npc['prompt'], getMessages(player), npc['model'], C.CONTEXT_TOKEN_BUDGET
+        )
+    return windows[botLabel]
+
+# add a logged chat message to the player's conversation windows
+def appendTurn(player, message):
+    for context in conversations.get(player.id, {}).values():
+        context.append(message)
+
 # message reaction information
 class CharPositionData(ExtraModel):
     # data links
@@ -349,6 +533,18 @@ class CharPositionData(ExtraModel):
     closestNPC = models.StringField()  # Closest NPC
     textPosition = models.StringField()  # Position from which the player texted
 
+# player movement trace (one row per buffered segment of posCheck samples)
+## samples are packed as little-endian float32 rows of (seconds since startTime, x, y, z) and base64 encoded,
+## which is ~21 bytes per sample instead of a JSON string per row; use decodeTrace to get them back
+class PositionTrace(ExtraModel):
+    # data links
+    player = models.Link(Player)
+
+    # trace info
+    startTime = models.FloatField()
+    numSamples = models.IntegerField()
+    samples = models.LongStringField()
+
 
 ########################################################
 # Custom export                                        #
@@ -370,57 +566,311 @@ def custom_export(players):
         'posPlayer',  # Player position
         'closestNPC',  # Closest NPC
         'textPosition',  # Position from which the player texted
+        'model',  # LLM model (bot replies)
+        'promptTokens',
+        'completionTokens',
+        'latency',  # Seconds from request to finished reply
+        'queueWait',  # Seconds of latency spent waiting for the rate limiter
+        'cost',  # Estimated USD
+        'cacheHit',
+        'llmCalls',  # Number of calls (usage summary rows)
     ]
 
+    # session and participant codes for every player, fetched in one query
+    codes = exportCodeLookup()
+
     # Export MessageData
-    mData = MessageData.filter()
-    for m in mData:
-        player = m.player
-        participant = player.participant
-        session = player.session
+    mData = exportRows(
+        MessageData,
+        MessageData.player_id,
+        MessageData.msgId,
+        MessageData.timestamp,
+        MessageData.sender,
+        MessageData.tone,
+        MessageData.content,
+        MessageData.fullText,
+        MessageData.msgText,
+        MessageData.model,
+        MessageData.promptTokens,
+        MessageData.completionTokens,
+        MessageData.latency,
+        MessageData.queueWait,
+        MessageData.cost,
+        MessageData.cacheHit,
+    )
+    for playerId, msgId, timestamp, sender, tone, content, fullText, msgText, *usage in mData:
+        sessionCode, participantCode = codes[playerId]
 
-        try:
-            fullText = json.loads(m.fullText)['content']
-        except:
-            fullText = m.fullText
+        # rows written before the role/content columns existed only have fullText
+        if content is None:
+            try:
+                content = json.loads(fullText)['content']
+            except (TypeError, ValueError, KeyError):
+                content = fullText
 
         yield [
-            session.code,
-            participant.code,
-            m.msgId,
-            m.timestamp,
-            m.sender,
-            m.tone,
-            fullText,
-            m.msgText,
+            sessionCode,
+            participantCode,
+            msgId,
+            timestamp,
+            sender,
+            tone,
+            content,
+            msgText,
             '',  # Placeholder for reactionData
             '',  # Placeholder for posPlayer
             '',  # Placeholder for closestNPC
             '',  # Placeholder for textPosition
+            *usage,
+            '',  # Placeholder for llmCalls
         ]
 
     # Export CharPositionData
-    posData = CharPositionData.filter()
-    for pos in posData:
-        player = pos.player
-        participant = player.participant
-        session = player.session
+    posData = exportRows(
+        CharPositionData,
+        CharPositionData.player_id,
+        CharPositionData.msgId,
+        CharPositionData.timestamp,
+        CharPositionData.posPlayer,
+        CharPositionData.closestNPC,
+        CharPositionData.textPosition,
+    )
+    for playerId, msgId, timestamp, posPlayer, closestNPC, textPosition in posData:
+        sessionCode, participantCode = codes[playerId]
 
         yield [
-            session.code,
-            participant.code,
-            pos.msgId,
-            pos.timestamp,
+            sessionCode,
+            participantCode,
+            msgId,
+            timestamp,
             '',  # Placeholder for sender
             '',  # Placeholder for tone
             '',  # Placeholder for fullText
             '',  # Placeholder for msgText
             '',  # Placeholder for reactionData
-            pos.posPlayer,
-            pos.closestNPC,
-            pos.textPosition,
+            posPlayer,
+            closestNPC,
+            textPosition,
+            '', '', '', '', '', '', '', '',  # Placeholders for llm usage
+        ]
+
+    # Export PositionTrace (one row per position sample)
+    traces = exportRows(
+        PositionTrace,
+        PositionTrace.player_id,
+        PositionTrace.startTime,
+        PositionTrace.samples,
+    )
+    for playerId, startTime, samples in traces:
+        sessionCode, participantCode = codes[playerId]
+
+        for t, x, y, z in decodeSamples(startTime, samples).tolist():
+            yield [
+                sessionCode,
+                participantCode,
+                'initial',
+                str(t),
+                '',  # Placeholder for sender
+                '',  # Placeholder for tone
+                '',  # Placeholder for fullText
+                '',  # Placeholder for msgText
+                '',  # Placeholder for reactionData
+                json.dumps({'x': round(x, 2), 'y': round(y, 2), 'z': round(z, 2)}),
+                '',  # Placeholder for closestNPC
+                '',  # Placeholder for textPosition
+                '', '', '', '', '', '', '', '',  # Placeholders for llm usage
+            ]
+
+    # Export llm usage totals per player and per session
+    for sessionCode, participantCode, calls, promptTokens, completionTokens, latency, cost in exportUsageTotals():
+        yield [
+            sessionCode,
+            participantCode,
+            'llmUsage' if participantCode else 'llmUsageSession',
+            '', '', '', '', '', '', '', '', '',  # Placeholders for message and position columns
+            '',  # Placeholder for model
+            promptTokens,
+            completionTokens,
+            latency,
+            '',  # Placeholder for queueWait
+            cost,
+            '',  # Placeholder for cacheHit
+            calls,
         ]
 
+# map player id -> (session code, participant code) with a single joined query
+def exportCodeLookup():
+    rows = (
+        Player.objects_filter()
+        .join(Participant, Player.participant_id == Participant.id)
+        .join(Session, Player.session_id == Session.id)
+        .with_entities(Player.id, Session.code, Participant.code)
+    )
+    return {playerId: (sessionCode, participantCode) for playerId, sessionCode, participantCode in rows}
+
+# llm usage totals per player, then per session (participant code empty), summed in the database
+def exportUsageTotals():
+    totals = [
+        Player.llmCalls,
+        Player.llmPromptTokens,
+        Player.llmCompletionTokens,
+        Player.llmLatency,
+        Player.llmCost,
+    ]
+    playerRows = (
+        Player.objects_filter()
+        .join(Participant, Player.participant_id == Participant.id)
+        .join(Session, Player.session_id == Session.id)
+        .filter(Player.llmCalls > 0)
+        .with_entities(Session.code, Participant.code, *totals)
+        .order_by(Player.id)
+    )
+    sessionRows = (
+        Player.objects_filter()
+        .join(Session, Player.session_id == Session.id)
+        .with_entities(Session.code, literal(''), *[func.sum(column) for column in totals])
+        .group_by(Session.code)
+        .having(func.sum(Player.llmCalls) > 0)
+    )
+    return list(playerRows) + list(sessionRows)
+
+# stream the given columns of an extra model in id order, fetching C.EXPORT_CHUNK_SIZE rows at a time
+## plain column tuples are returned, so no ORM objects (or their lazy links) are loaded per row
+def exportRows(Model, *columns):
+    return (
+        Model.objects_filter()
+        .with_entities(*columns)
+        .order_by(Model.id)
+        .yield_per(C.EXPORT_CHUNK_SIZE)
+    )
+
+
+########################################################
+# Position telemetry                                   #
+########################################################
+
+# position samples waiting to be written, keyed by player id
+## posCheck messages arrive every few seconds for every participant, so rather than one insert per message
+## the samples are buffered in memory and written in bulk (by count, by age, and always on page submit).
+## each message only checks its own player's buffer, so the cost doesn't grow with the session
+posBuffer = {}
+
+# columns of a decoded trace
+TRACE_COLUMNS = ['t', 'x', 'y', 'z']
+
+# add position samples for a player and write out their buffer if it is full or old enough
+## samples are stamped with the browser's clock; sent is the browser's clock when the batch was sent,
+## so every t is shifted by the offset to the server clock measured on arrival. without sent, samples
+## get the arrival time
+def bufferPositions(player, samples, sent=None):
+    dateNow = datetime.now(tz=timezone.utc).timestamp()
+    clockOffset = dateNow - float(sent) if sent is not None else None
+    buffer = posBuffer.setdefault(player.id, dict(since=time.monotonic(), rows=[]))
+    for sample in samples:
+        pos = sample['pos']
+        buffer['rows'].append((
+            float(sample['t']) + clockOffset if clockOffset is not None and 't' in sample else dateNow,
+            float(pos['x']),
+            float(pos['y']),
+            float(pos['z']),
+        ))
+
+    if len(buffer['rows']) >= C.POS_FLUSH_SIZE or time.monotonic() - buffer['since'] >= C.POS_FLUSH_SECONDS:
+        flushPositions(player.id)
+
+# write all buffered samples for a player as one packed trace segment
+def flushPositions(playerId):
+    buffer = posBuffer.pop(playerId, None)
+    if buffer:
+        PositionTrace.create(player_id=playerId, **encodeTrace(buffer['rows']))
+
+# pack (t, x, y, z) samples into PositionTrace fields
+def encodeTrace(rows):
+    trace = np.array(rows, dtype=np.float64)
+    startTime = trace[0, 0]
+    trace[:, 0] -= startTime
+    return dict(
+        startTime=startTime,
+        numSamples=len(trace),
+        samples=base64.b64encode(trace.astype('<f4').tobytes()).decode('ascii'),
+    )
+
+# unpack a PositionTrace into an (n, 4) array of absolute time, x, y, z
+def decodeTrace(trace):
+    return decodeSamples(trace.startTime, trace.samples)
+
+def decodeSamples(startTime, encoded):
+    packed = np.frombuffer(base64.b64decode(encoded), dtype='<f4')
+    samples = packed.reshape(-1, len(TRACE_COLUMNS)).astype(np.float64)
+    samples[:, 0] += startTime
+    return samples
+
+
+########################################################
+# Bot replies                                          #
+########################################################
+
+# save a finished bot reply and build the botText event for chat.html
+def saveBotMsg(player, result, botId, tone, dateNow):
+    botText, info = result
+
+    # extract output
+    botContent = json.loads(botText)
+    outputText = botContent['text']
+    botMsgId = botContent['msgId']
+    botMsg = {'role': 'assistant', 'content': botText}
+
+    MessageData.create(
+        player=player,
+        sender=botId,
+        msgId=botMsgId,
+        timestamp=dateNow,
+        tone=tone,
+        fullText=json.dumps(botMsg),
+        msgText=outputText,
+        target=botId,
+        role='assistant',
+        content=botText,
+        cacheHit=info['cacheHit'],
+        model=info['model'],
+        promptTokens=info['promptTokens'],
+        completionTokens=info['completionTokens'],
+        latency=info['latency'],
+        queueWait=info['queueWait'],
+        cost=info['cost'],
+    )
+    appendTurn(player, botMsg)
+
+    # update the player's usage totals
+    player.llmCalls += 1
+    player.llmPromptTokens += info['promptTokens']
+    player.llmCompletionTokens += info['completionTokens']
+    player.llmLatency += info['latency']
+    player.llmCost += info['cost']
+
+    # return data to chat.html
+    return dict(
+        event='botText',
+        botMsgId=botMsgId,
+        text=outputText,
+        tone=tone,
+        sender=botId,
+        phase=player.phase
+    )
+
+
+# botText event for a reply whose llm call failed, so the NPC still answers (nothing is saved)
+def failedBotMsg(player, botId, tone):
+    return dict(
+        event='botText',
+        botMsgId=None,
+        text=C.FALLBACK_REPLY,
+        tone=tone,
+        sender=botId,
+        phase=player.phase,
+        failed=True,
+    )
+
 
 ########################################################
 # Pages                                                #
@@ -429,6 +879,8 @@ def custom_export(players):
 # chat page 
 class chat(Page):
     form_model = 'player'
+    # position samples still queued in the browser are posted with the form
+    form_fields = ['pendingPositions']
     timeout_seconds = 60
 
     # vars that we will pass to chat.html
@@ -438,6 +890,18 @@ class chat(Page):
             debug = C.DEBUG,
         )
 
+    # write any position samples still buffered for this player
+    @staticmethod
+    def before_next_page(player, timeout_happened):
+        if player.pendingPositions:
+            try:
+                batch = json.loads(player.pendingPositions)
+                bufferPositions(player, batch['samples'], batch.get('sent'))
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f'Malformed pending positions: {player.pendingPositions[:200]!r}')
+            player.pendingPositions = ''
+        flushPositions(player.id)
+
     # vars that we will pass to chat.html
     @staticmethod
     def js_vars(player):
@@ -454,6 +918,7 @@ class chat(Page):
             roomHeight = C.ROOM_HEIGHT,
             npcPersonalSpace = C.NPC_PERSONAL_SPACE,
             npcJitter = C.NPC_JITTER,
+            posBatchSize = C.POS_BATCH_SIZE,
             debug = C.DEBUG,
         )
 
@@ -461,15 +926,12 @@ class chat(Page):
     @staticmethod
     def live_method(player: Player, data):
         
-        # if no new data, just return cached messages
+        # if no new data, just return the conversation so far
         if not data:
             return {player.id_in_group: dict(
-                messages=json.loads(player.cachedMessages),
+                messages=getMessages(player),
                 reactions=[]
             )}
-        
-        # if we have new data, process it and update cache
-        messages = json.loads(player.cachedMessages)
 
         # create current player identifier
         currentPlayer = 'P' + str(player.id_in_group)
@@ -490,29 +952,22 @@ class chat(Page):
                 text = data.get('text', '')
                 posData = data.get('pos', {})
                 currentPlayer = 'P' + str(player.id_in_group)
-                messages = json.loads(player.cachedMessages)
                 
-                # calculate distance to NPCs
-                print('Player pos:', posData)
-                npcDistances = calculate_npc_distances(posData)
-                print('NPC distances:', npcDistances)
-
-                # determine closest NPC (within 10 units of distance)
-                min_distance = min(npcDistances.values())
-                closestNPC = None if min_distance > 10 else [x for x in npcDistances if npcDistances[x] == min_distance][0]
-                print('Closest NPC:', closestNPC)
+                # determine closest NPC (within C.NPC_TALK_RADIUS units of distance)
+                closestNPC = npcIndex.nearest(posData)
 
                 # create message id
                 dateNow = str(datetime.now(tz=timezone.utc).timestamp())
                 msgId = currentPlayer + '-' + dateNow
                 
                 # create message
-                msg = {'role': 'user', 'content': json.dumps({
+                content = json.dumps({
                     'sender': currentPlayer,
                     'msgId': msgId,
                     'tone': tone,
                     'text': text,
-                })}
+                })
+                msg = {'role': 'user', 'content': content}
                 
                 # save to database
                 MessageData.create(
@@ -524,13 +979,10 @@ class chat(Page):
                     fullText=json.dumps(msg),
                     msgText=text,
                     target=closestNPC,
+                    role='user',
+                    content=content,
                 )
-                
-                # append to messages
-                messages.append(msg)
-                
-                # update cache
-                player.cachedMessages = json.dumps(messages)
+                appendTurn(player, msg)
                 
                 # return output to chat.html
                 return {player.id_in_group: dict(
@@ -551,37 +1003,24 @@ class chat(Page):
                 dateNow = str(datetime.now(tz=timezone.utc).timestamp())
 
                 if botId:
-                    botText = runGPT(messages, tone, botId)
-                    print('botId:', botId)
-                    print('botText:', botText)
-
-                    # extract output
-                    botContent = json.loads(botText)
-                    outputText = botContent['text']
-                    botMsgId = botContent['msgId']
-                    botMsg = {'role': 'assistant', 'content': botText}
-                    
-                    MessageData.create(
-                        player=player,
-                        sender=botId,
-                        msgId=botMsgId,
-                        timestamp=dateNow,
-                        tone=tone,
-                        fullText=json.dumps(botMsg),
-                        msgText=outputText,
-                        target=botId
+                    # runGPT fails for an unknown bot, which has no window, and the fallback reply is sent
+                    context = getConversation(player, botId).copy() if botId in NPC_REGISTRY else None
+                    useCache = player.session.config.get('llm_cache', False)
+                    provider = player.session.config.get('llm_provider', C.LLM_PROVIDER)
+
+                    # run the llm call in the background so other participants aren't blocked;
+                    # the reply is pushed to chat.html as a botText event once it arrives
+                    # (and as botDelta events while it streams in)
+                    payload = dispatch(
+                        player,
+                        runGPT,
+                        (context, tone, botId, useCache, provider),
+                        lambda player, result: saveBotMsg(player, result, botId, tone, dateNow),
+                        on_progress=(lambda text: dict(event='botDelta', text=text, sender=botId)) if C.STREAM_REPLIES else None,
+                        on_error=lambda player: failedBotMsg(player, botId, tone),
                     )
-                    messages.append(botMsg)
-
-                    # return data to chat.html
-                    return {player.id_in_group: dict(
-                        event='botText',
-                        botMsgId=botMsgId,
-                        text=outputText,
-                        tone=tone,
-                        sender=botId,
-                        phase=player.phase
-                    )}
+                    if payload:
+                        return {player.id_in_group: payload}
 
 
                 # if botId is None, then no NPC is close enough to chat
@@ -593,26 +1032,16 @@ class chat(Page):
             # handle position check updates
             elif event == 'posCheck':
                 
-                # get time stamp
-                dateNow = str(datetime.now(tz=timezone.utc).timestamp())
-                    
-                # grab position data
-                posData = data["pos"]
+                # grab position data (the client sends a batch of samples, older clients a single pos)
+                samples = data.get('samples') or [dict(pos=data['pos'])]
 
-                # save to database
-                CharPositionData.create(
-                        player=player,
-                        msgId='initial',
-                        timestamp=dateNow,
-                        posPlayer=json.dumps(posData),
-                        posRed='',
-                        posBlack='',
-                        posGreen='',
-                    )
+                # buffer for a bulk write
+                bufferPositions(player, samples, data.get('sent'))
+
+                # chat.html never asks for a reply; load tests send an ack id to time the round trip
+                if 'ack' in data:
+                    return {player.id_in_group: dict(event='posAck', ack=data['ack'])}
 
-                print('posData')
-                print(posData)
-                
             # handle phase updates
             elif event == 'phase':
                 
@@ -0,0 +1,53 @@
+from otree.api import Currency as cu, currency_range, expect, Bot, Submission, SubmissionMustFail
+from . import *
+
+
+class PlayerBot(Bot):
+
+    def play_round(self):
+        # the chat page has no next button; it advances when its timer runs out,
+        # posting the position samples still queued in the browser with the form
+        pending = dict(samples=[dict(pos=C.RED_POS, t=100), dict(pos=C.BLACK_POS, t=101.5)], sent=102)
+        yield Submission(chat, dict(pendingPositions=json.dumps(pending)), check_html=False, timeout_happened=True)
+
+        # they are in the trace, shifted onto the server clock, and not kept on the player
+        trace = decodeTrace(PositionTrace.filter(player=self.player)[-1])
+        expect(trace[-1, 1:].tolist(), [C.BLACK_POS['x'], C.BLACK_POS['y'], C.BLACK_POS['z']])
+        expect(round(trace[-1, 0] - trace[-2, 0], 2), 1.5)
+        expect(self.player.pendingPositions, '')
+
+
+def call_live_method(method, group, **kwargs):
+    # bot replies are only requested from the offline provider, so bots never use API credits
+    provider = get_provider(group.session.config.get('llm_provider', C.LLM_PROVIDER))
+
+    for player in group.get_players():
+        idInGroup = player.id_in_group
+
+        reply = method(idInGroup, dict(event='phase', phase=0))[idInGroup]
+        expect(reply['phase'], 1)
+
+        method(idInGroup, dict(event='posCheck', samples=[
+            dict(pos=C.RED_POS, t=0), dict(pos=C.RED_POS, t=1),
+        ], sent=1))
+
+        reply = method(idInGroup, dict(event='text', text='Hello, did you see anything?', pos=C.RED_POS))[idInGroup]
+        expect(reply['target'], C.BOT_LABEL1)
+
+        if provider == 'local':
+            reply = method(idInGroup, dict(event='botMsg', botId=C.BOT_LABEL1))[idInGroup]
+            expect(reply['event'], 'botText')
+            expect(reply['sender'], C.BOT_LABEL1)
+
+        # a failed llm call (here an unknown NPC) still answers, with the fallback reply
+        reply = method(idInGroup, dict(event='botMsg', botId='nobody'))[idInGroup]
+        expect(reply['event'], 'botText')
+        expect(reply['text'], C.FALLBACK_REPLY)
+
+        messages = method(idInGroup, {})[idInGroup]['messages']
+        expect(len(messages), 2 if provider == 'local' else 1)
+
+        # the bot's window is kept up to date as turns are logged, without rereading the log
+        if provider == 'local':
+            reply = method(idInGroup, dict(event='text', text='And after that?', pos=C.RED_POS))[idInGroup]
+            expect(list(getConversation(player, C.BOT_LABEL1).turns), getMessages(player))
@@ -0,0 +1,177 @@
+"""
+Page timing shared by the oTree apps in this project
+
+Pages that subclass TimedPage instead of Page record when the participant
+first saw them and when they submitted them. Reloading a page keeps the first
+render time, and a form that fails validation keeps the clock running until
+the submission that gets through. Times come from a monotonic clock, so wall
+clock adjustments on the server don't skew them. All of a participant's times
+live in one dict in participant.vars['page_timing'], keyed by page index:
+    {page_index: [first_render, submit, client], ...}
+
+Server times include network latency and any time the tab spent in the
+background. The page template (_templates/global/Page.html) therefore also
+posts the browser's own performance.now() times with the form, and every
+submission that carries them appends one record to client:
+    {'paint': ms, 'submit': ms, 'hidden': [[start_ms, end_ms], ...]}
+A page that failed validation is loaded again, so it gets one record per load.
+client_seconds adds up the time the page was actually visible.
+
+Nothing is stored on the player. Apps export the times with
+    def custom_export(players):
+        yield from export_page_times(players, page_sequence)
+which pivots them into one row per player and two columns per timing_name
+set on the app's pages: <name>_page_time (server) and <name>_visible_time
+(browser). Pages that share a timing_name add up into the same columns.
+"""
+
+from math import isfinite
+import json
+import time
+
+from otree.api import Page
+from otree.lookup import get_page_lookup
+from otree.models import Participant, Session
+
+# form field the page template posts the browser's times in
+CLIENT_TIMING_FIELD = '_client_timing'
+# cap on the background stretches kept per page load
+MAX_HIDDEN_INTERVALS = 100
+
+
+def page_seconds(times):
+    """Seconds between first render and submit of a page's timing entry, or None if it wasn't submitted (yet)"""
+    if not times or times[1] is None:
+        return None
+    seconds = times[1] - times[0]
+    # a server restart between render and submit resets the monotonic clock
+    return seconds if seconds >= 0 else None
+
+
+def client_seconds(times):
+    """Seconds a page was visible in the browser between first paint and submit, or None if the browser sent no times"""
+    if not times or not times[2]:
+        return None
+    visible = 0
+    for record in times[2]:
+        hidden = sum(end - start for start, end in record['hidden'])
+        visible += max(record['submit'] - record['paint'] - hidden, 0)
+    return visible / 1000
+
+
+def parse_client_timing(raw):
+    """The browser's times posted with a form as a client record, or None if they're missing or malformed"""
+    try:
+        data = json.loads(raw)
+        paint = float(data['paint'])
+        submit = float(data['submit'])
+        hidden = [[float(start), float(end)] for start, end in data.get('hidden', [])[:MAX_HIDDEN_INTERVALS]]
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return None
+    numbers = [paint, submit] + [t for interval in hidden for t in interval]
+    if not all(isfinite(t) and t >= 0 for t in numbers) or paint > submit:
+        return None
+    # only the part of each stretch between paint and submit counts
+    hidden = [[max(start, paint), min(end, submit)] for start, end in hidden]
+    return dict(paint=paint, submit=submit, hidden=[interval for interval in hidden if interval[0] < interval[1]])
+
+
+def timed_page_lookup(sessionCode, page_sequence):
+    """{page_index: (timing_name, round_number)} for the timed pages of page_sequence in a session
+
+    Page indexes are mapped back to their pages the same way oTree does when routing requests.
+    """
+    lookup = {}
+    pageIndex = 1
+    while True:
+        try:
+            page = get_page_lookup(sessionCode, pageIndex)
+        except KeyError:
+            return lookup
+        name = getattr(page.page_class, 'timing_name', None)
+        if name and page.page_class in page_sequence:
+            lookup[pageIndex] = (name, page.round_number)
+        pageIndex += 1
+
+
+def export_page_times(players, page_sequence):
+    """custom_export rows with the seconds spent on each timed page of an app, one row per player"""
+    names = []
+    for page in page_sequence:
+        name = getattr(page, 'timing_name', None)
+        if name and name not in names:
+            names.append(name)
+    yield ['session', 'participant', 'round_number'] + [
+        f'{name}_{kind}_time' for name in names for kind in ('page', 'visible')
+    ]
+
+    players = list(players)
+    if not players:
+        return
+
+    # session and participant codes and the timing dicts of every player in one query,
+    # rather than loading each player's participant and session
+    Player = type(players[0])
+    rows = (
+        Player.objects_filter()
+        .join(Participant, Player.participant_id == Participant.id)
+        .join(Session, Player.session_id == Session.id)
+        .filter(Player.session_id.in_({player.session_id for player in players}))
+        .with_entities(Player.id, Session.code, Participant.code, Participant._vars)
+    )
+    codes = {playerId: (sessionCode, participantCode, vars_) for playerId, sessionCode, participantCode, vars_ in rows}
+
+    # the page lookup is built once per session
+    lookups = {}
+    for player in players:
+        sessionCode, participantCode, vars_ = codes[player.id]
+        if sessionCode not in lookups:
+            lookups[sessionCode] = timed_page_lookup(sessionCode, page_sequence)
+        lookup = lookups[sessionCode]
+
+        seconds = {}
+        for pageIndex, times in vars_.get('page_timing', {}).items():
+            name, roundNumber = lookup.get(pageIndex, (None, None))
+            if roundNumber != player.round_number:
+                continue
+            for kind, value in (('page', page_seconds(times)), ('visible', client_seconds(times))):
+                if value is not None:
+                    seconds[name, kind] = seconds.get((name, kind), 0) + value
+        yield [sessionCode, participantCode, player.round_number] + [
+            seconds.get((name, kind)) for name in names for kind in ('page', 'visible')
+        ]
+
+
+class TimedPage(Page):
+
+    # column name for the page in export_page_times
+    timing_name = None
+
+    def get(self):
+        response = super().get()
+        # only rendered pages start the clock, not skipped pages that redirect
+        if response.status_code == 200:
+            timing = self.participant.vars.get('page_timing', {})
+            if self._index_in_pages not in timing:
+                timing = dict(timing)
+                timing[self._index_in_pages] = [time.monotonic(), None, []]
+                self.participant.vars['page_timing'] = timing
+        return response
+
+    def post(self):
+        submitted = time.monotonic()
+        clientRecord = parse_client_timing(self._form_data.get(CLIENT_TIMING_FIELD))
+        response = super().post()
+        # a redirect means the submission got through; invalid forms are rendered again
+        accepted = response.status_code == 302
+        timing = self.participant.vars.get('page_timing', {})
+        if self._index_in_pages in timing and (accepted or clientRecord):
+            firstRender, submit, client = timing[self._index_in_pages]
+            timing = dict(timing)
+            timing[self._index_in_pages] = [
+                firstRender,
+                submitted if accepted else submit,
+                client + [clientRecord] if clientRecord else client,
+            ]
+            self.participant.vars['page_timing'] = timing
+        return response